@@ -7,18 +7,84 @@ class Settings(BaseSettings):
     environment: str = "development"
     debug: bool = False  # Set to True only when debugging SQL queries
 
+    # Database connection pool. Handlers only hold a connection while their
+    # DB work runs (see run_in_session), so a small pool serves many chats.
+    db_pool_size: int = 5
+    db_max_overflow: int = 5
+    db_pool_timeout_seconds: float = 10.0
+    db_pool_recycle_seconds: int = 1800
+    db_statement_timeout_ms: int = 15000  # Postgres statement_timeout, 0 = none
+    db_wait_warning_ms: float = 200.0  # log handlers that wait longer for a connection
+    # Bot hot reads (user lookup, context, history) on the asyncpg engine
+    # instead of the sync worker pool
+    db_async_reads: bool = True
+
     # Together.ai settings (for AI responses)
     together_api_key: str = ""
 
+    # Together.ai HTTP client: one pooled keep-alive client per process
+    together_max_connections: int = 20
+    together_max_keepalive_connections: int = 10
+    together_keepalive_expiry_seconds: float = 60.0
+    together_http2: bool = True
+    together_connect_timeout_seconds: float = 5.0
+    together_read_timeout_seconds: float = 30.0
+
     # Pinecone settings (for memory/embeddings)
     pinecone_api_key: str = ""
 
+    # Vector index backend: "pinecone" (hosted) or "local" (memory-mapped NumPy files)
+    vector_backend: str = "pinecone"
+    local_vector_dir: str = "vectors"
+
     # OpenAI settings (for embeddings)
     openai_api_key: str = ""
 
+    # Embedding cache: in-memory LRU entries (~6 KB each at 1536 dims) + persistent SQLite file ("" = memory only)
+    embedding_cache_size: int = 10000
+    embedding_cache_path: str = "cache/embeddings.sqlite3"
+
     # Telegram settings (primary interface)
     telegram_bot_token: str = ""
 
+    # Per-source time budgets (seconds) for retrieval before the LLM call.
+    # A source that misses its budget is skipped rather than failing the reply.
+    context_timeout_seconds: float = 3.0
+    memory_timeout_seconds: float = 1.5
+    history_timeout_seconds: float = 2.0
+
+    # Stream replies into one Telegram message, edited in place as tokens arrive.
+    # Telegram throttles edits, so at most one edit per interval (seconds).
+    stream_responses: bool = True
+    stream_edit_interval_seconds: float = 1.0
+
+    # Per-user context snapshot: sections rebuild when their data changes,
+    # and at least this often (seconds) for date-relative fields.
+    context_cache_ttl_seconds: float = 300.0
+    context_cache_max_users: int = 1000
+
+    # Telegram chat_id -> user cache (entries drop when the user row changes)
+    chat_user_cache_max_entries: int = 10000
+
+    # PatternRecognizer analyses are shared across requests until the tasks or
+    # conversations they read change, or this many seconds pass.
+    pattern_analysis_cache_ttl_seconds: float = 300.0
+    pattern_analysis_cache_max_entries: int = 5000
+
+    # Daily analytics rollups, refreshed by the bot this often (seconds). Task
+    # columns are recomputed over the last rollup_task_window_days (statuses
+    # keep changing; no analysis looks further back), the append-only
+    # sources over the last rollup_activity_window_days.
+    rollup_refresh_interval_seconds: float = 900.0
+    rollup_task_window_days: int = 31
+    rollup_activity_window_days: int = 2
+
+    # Post-reply work (conversation save, learnings, Pinecone) runs on a
+    # write-behind queue; jobs are spooled here until they complete.
+    write_behind_spool_dir: str = "spool/post_reply"
+    write_behind_workers: int = 2
+    write_behind_max_attempts: int = 5
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
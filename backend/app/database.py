@@ -1,22 +1,144 @@
+import asyncio
+import logging
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from app.config import get_settings
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
+
+def _connect_args() -> dict:
+    if settings.database_url.startswith("postgresql") and settings.db_statement_timeout_ms:
+        # Runaway queries fail instead of pinning a pooled connection
+        return {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+    return {}
+
+
 engine = create_engine(
     settings.database_url,
     echo=settings.debug,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_seconds,
+    pool_recycle=settings.db_pool_recycle_seconds,
+    pool_pre_ping=True,  # drop connections the server closed while idle
+    connect_args=_connect_args(),
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Blocking ORM work from async handlers runs on this pool so the bot's event
+# loop keeps serving other chats. One worker per pooled connection, so a
+# worker never waits on the pool for long.
+_db_executor = ThreadPoolExecutor(
+    max_workers=settings.db_pool_size + settings.db_max_overflow,
+    thread_name_prefix="db"
+)
+
 
 class Base(DeclarativeBase):
     pass
 
 
+# Async engine for the bot's hot reads (asyncpg), created on first use so
+# scripts and the sync paths don't need the driver. Same pool settings.
+_async_sessionmaker = None
+
+# DATABASE_URL is written for psycopg2 (libpq); asyncpg rejects libpq's
+# query parameters, so they are translated to connect() arguments or dropped
+_SSL_FILE_PARAMS = ("sslrootcert", "sslcert", "sslkey")
+_LIBPQ_ONLY_PARAMS = (
+    "options", "gssencmode", "channel_binding", "sslcrl", "sslpassword", "sslcompression", "sslsni",
+    "requirepeer", "krbsrvname", "keepalives", "keepalives_idle", "keepalives_interval", "keepalives_count",
+)
+
+
+def _async_url() -> Tuple[URL, dict]:
+    """The database URL for asyncpg and the connect args translated from its libpq parameters."""
+    url = make_url(settings.database_url)
+    if url.get_backend_name() != "postgresql":
+        return url, {}
+
+    query = url.query
+    connect_args = {}
+    server_settings = {}
+
+    sslmode = query.get("sslmode")
+    ssl_files = {name: query[name] for name in _SSL_FILE_PARAMS if name in query}
+    if ssl_files and sslmode != "disable":
+        connect_args["ssl"] = _ssl_context(sslmode, ssl_files)
+    elif sslmode:
+        connect_args["ssl"] = sslmode  # asyncpg takes the same mode names
+    if "connect_timeout" in query:
+        connect_args["timeout"] = float(query["connect_timeout"])
+    if "application_name" in query:
+        server_settings["application_name"] = query["application_name"]
+    if settings.db_statement_timeout_ms:
+        server_settings["statement_timeout"] = str(settings.db_statement_timeout_ms)
+    if server_settings:
+        connect_args["server_settings"] = server_settings
+
+    dropped = [name for name in _LIBPQ_ONLY_PARAMS if name in query]
+    if dropped:
+        logger.warning(f"Ignoring libpq-only DATABASE_URL parameters for the async engine: {', '.join(dropped)}")
+
+    url = url.difference_update_query(
+        ("sslmode", "connect_timeout", "application_name") + _SSL_FILE_PARAMS + _LIBPQ_ONLY_PARAMS
+    )
+    return url.set(drivername="postgresql+asyncpg"), connect_args
+
+
+def _ssl_context(sslmode: Optional[str], files: dict) -> ssl.SSLContext:
+    """An SSLContext matching libpq's sslmode with certificate files."""
+    context = ssl.create_default_context(cafile=files.get("sslrootcert"))
+    if sslmode != "verify-full":
+        context.check_hostname = False
+    # Like libpq, a root certificate means the server's is verified
+    if sslmode not in ("verify-ca", "verify-full") and "sslrootcert" not in files:
+        context.verify_mode = ssl.CERT_NONE
+    if "sslcert" in files:
+        context.load_cert_chain(files["sslcert"], files.get("sslkey"))
+    return context
+
+
+def get_async_sessionmaker():
+    """Get or create the async session factory"""
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url, connect_args = _async_url()
+        async_engine = create_async_engine(
+            url,
+            echo=settings.debug,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_pre_ping=True,
+            connect_args=connect_args,
+        )
+        _async_sessionmaker = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return _async_sessionmaker
+
+
+async def dispose_async_engine():
+    """Close the async engine's pooled connections (on shutdown)."""
+    global _async_sessionmaker
+    if _async_sessionmaker is not None:
+        await _async_sessionmaker.kw["bind"].dispose()
+        _async_sessionmaker = None
+
+
 def get_db():
     """Dependency for getting database sessions."""
     db = SessionLocal()
@@ -24,3 +146,52 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def run_in_session(fn, *args, **kwargs):
+    """
+    Run ``fn(db, *args, **kwargs)`` on the DB worker pool with a fresh session.
+
+    The session is opened and closed inside the worker thread, so callers
+    never hold a connection across an ``await``. Time spent waiting for a
+    worker and for a pooled connection is logged per ``fn``.
+    """
+    submitted = time.perf_counter()
+
+    def _call():
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            db.connection()  # check out now, to time the pool wait
+            connected = time.perf_counter()
+            _log_wait(fn, started - submitted, connected - started)
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, _call)
+
+
+async def run_in_async_session(fn, *args, **kwargs):
+    """
+    Await ``fn(session, *args, **kwargs)`` with a fresh AsyncSession - the
+    query I/O interleaves with other chats on the event loop. Connection
+    wait is logged like run_in_session's.
+    """
+    async with get_async_sessionmaker()() as session:
+        started = time.perf_counter()
+        await session.connection()
+        _log_wait(fn, 0.0, time.perf_counter() - started)
+        return await fn(session, *args, **kwargs)
+
+
+def _log_wait(fn, queued: float, checkout: float):
+    waited_ms = (queued + checkout) * 1000
+    level = logging.WARNING if waited_ms >= settings.db_wait_warning_ms else logging.DEBUG
+    if logger.isEnabledFor(level):
+        logger.log(
+            level,
+            f"DB wait for {getattr(fn, '__name__', fn)}: {queued * 1000:.0f}ms for a worker, "
+            f"{checkout * 1000:.0f}ms for a connection"
+        )
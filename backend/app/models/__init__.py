@@ -1,5 +1,6 @@
 from app.models.user import User
 from app.models.conversation import Conversation
+from app.models.intention import IntentionMention
 from app.models.goal import Goal
 from app.models.project import Project
 from app.models.task import Task
@@ -10,10 +11,12 @@ from app.models.checkin import Checkin
 from app.models.wheel import WheelCategory, WheelScore
 from app.models.calendar import CalendarEvent
 from app.models.metric import Metric, ConversationEmbedding
+from app.models.rollup import UserDailyRollup
 
 __all__ = [
     "User",
     "Conversation",
+    "IntentionMention",
     "Goal",
     "Project",
     "Task",
@@ -26,4 +29,5 @@ __all__ = [
     "CalendarEvent",
     "Metric",
     "ConversationEmbedding",
+    "UserDailyRollup",
 ]
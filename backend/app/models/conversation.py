@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import ForeignKey, String, Text, Index
+from sqlalchemy import ForeignKey, String, Text, Index, desc
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -20,11 +20,14 @@ class Conversation(Base):
     context: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
     suggestions: Mapped[Optional[list]] = mapped_column(JSONB, nullable=True)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    # Write-behind job that saved the row, so a replayed job doesn't save it twice
+    job_id: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
 
     __table_args__ = (
-        Index("idx_conversations_user_id", "user_id"),
+        Index("idx_conversations_user_created_at", "user_id", desc("created_at")),
         Index("idx_conversations_session_id", "session_id"),
         Index("idx_conversations_created_at", "created_at"),
+        Index("idx_conversations_job_id", "job_id", unique=True),
     )
 
     def __repr__(self) -> str:
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from sqlalchemy import ForeignKey, String, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class IntentionMention(Base):
+    """
+    One "I'll do X later" in a user message, extracted when the conversation
+    is saved. Repeated-intention detection groups these by activity.
+    """
+    __tablename__ = "intention_mentions"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    conversation_id: Mapped[int] = mapped_column(ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
+    activity: Mapped[str] = mapped_column(String(200), nullable=False)  # normalized
+    phrase: Mapped[str] = mapped_column(String(50), nullable=False)
+    mentioned_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_intention_mentions_user_mentioned_activity", "user_id", "mentioned_at", "activity"),
+        Index("idx_intention_mentions_conversation_id", "conversation_id"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<IntentionMention(id={self.id}, activity={self.activity!r})>"
@@ -1,5 +1,5 @@
 """Pattern tracking models."""
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import JSONB
 from app.database import Base
@@ -44,3 +44,30 @@ class PatternHypothesis(Base):
     last_updated = Column(DateTime, server_default=func.now(), nullable=False)
     status = Column(String(20), default='exploring', nullable=False)
     needs_exploration = Column(Boolean, default=False, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("idx_pattern_hypotheses_category_sub_pattern", "category_id", "sub_pattern"),
+        Index("idx_pattern_hypotheses_user_status_confidence", "user_id", "status", "confidence"),
+    )
+
+
+class PatternSubpatternStats(Base):
+    """
+    Running observation counter per (category, sub_pattern).
+
+    Maintained on every add_observation so hypotheses can be updated without
+    rescanning history. Observations without a sub-pattern count under
+    'general'. Rebuild with ``python backfill.py pattern-stats``.
+    """
+    __tablename__ = "pattern_subpattern_stats"
+    __table_args__ = (
+        UniqueConstraint("category_id", "sub_pattern", name="uq_pattern_subpattern_stats_category_sub_pattern"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    category_id = Column(Integer, ForeignKey("pattern_categories.id", ondelete="CASCADE"), nullable=False)
+    sub_pattern = Column(String(100), nullable=False)  # 'general' when no sub-pattern
+    observation_count = Column(Integer, default=0, nullable=False)
+    first_observed_at = Column(DateTime, server_default=func.now(), nullable=False)
+    last_observed_at = Column(DateTime, server_default=func.now(), nullable=False)
@@ -47,7 +47,7 @@ class Project(Base):
     milestones: Mapped[list["Milestone"]] = relationship("Milestone", back_populates="project", cascade="all, delete-orphan")
     
     __table_args__ = (
-        Index("idx_projects_user_status", "user_id", "status"),
+        Index("idx_projects_user_status_deadline", "user_id", "status", "deadline"),
         Index("idx_projects_deadline", "deadline"),
     )
 
@@ -0,0 +1,51 @@
+"""Materialized analytics rollups."""
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import JSONB
+from app.database import Base
+
+
+class UserDailyRollup(Base):
+    """
+    One user's activity on one (UTC) day, summarized from tasks,
+    conversations, work_sessions and checkins by app.services.rollups.
+    """
+    __tablename__ = "user_daily_rollups"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+
+    # Tasks created this day, by their current status
+    tasks_created = Column(Integer, default=0, server_default="0", nullable=False)
+    tasks_done = Column(Integer, default=0, server_default="0", nullable=False)
+    tasks_in_progress = Column(Integer, default=0, server_default="0", nullable=False)
+    tasks_todo = Column(Integer, default=0, server_default="0", nullable=False)
+    done_seconds_total = Column(Float, default=0, server_default="0", nullable=False)  # created -> completed
+    done_timed = Column(Integer, default=0, server_default="0", nullable=False)  # done tasks with completed_at
+
+    # Tasks completed this day
+    tasks_completed = Column(Integer, default=0, server_default="0", nullable=False)
+    completions_by_hour = Column(JSONB, default={}, server_default="{}", nullable=False)  # {"14": 2}, user's local hour
+
+    # Conversations: project mentioned by each message, see detect_context_switching
+    messages = Column(Integer, default=0, server_default="0", nullable=False)
+    project_switches = Column(Integer, default=0, server_default="0", nullable=False)
+    first_project = Column(String(200), nullable=True)  # project of the day's first message
+    last_project = Column(String(200), nullable=True)  # project of the day's last message
+
+    # Work sessions started this day
+    work_sessions = Column(Integer, default=0, server_default="0", nullable=False)
+    work_sessions_completed = Column(Integer, default=0, server_default="0", nullable=False)
+    focus_minutes = Column(Integer, default=0, server_default="0", nullable=False)
+
+    # Check-ins
+    checkins = Column(Integer, default=0, server_default="0", nullable=False)
+    energy_total = Column(Integer, default=0, server_default="0", nullable=False)
+    energy_ratings = Column(Integer, default=0, server_default="0", nullable=False)
+
+    refreshed_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", name="uq_user_daily_rollups_user_day"),
+    )
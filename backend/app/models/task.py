@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import Optional
 from enum import Enum
 
-from sqlalchemy import String, Text, Integer, DateTime, ForeignKey, Index, Enum as SQLEnum
+from sqlalchemy import String, Text, Integer, DateTime, ForeignKey, Index, Enum as SQLEnum, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -67,9 +67,10 @@ class Task(Base):
     project: Mapped[Optional["Project"]] = relationship("Project", back_populates="tasks")
     
     __table_args__ = (
-        Index("idx_tasks_user_status", "user_id", "status"),
+        Index("idx_tasks_user_status_due_date", "user_id", "status", "due_date"),
         Index("idx_tasks_project", "project_id"),
         Index("idx_tasks_due_date", "due_date"),
+        Index("idx_tasks_completed_at", "completed_at", postgresql_where=text("completed_at IS NOT NULL")),
     )
 
     def __repr__(self) -> str:
@@ -35,7 +35,10 @@ class User(Base):
     telegram_username: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     morning_briefing_time: Mapped[str] = mapped_column(String(5), default="09:00")
 
-    __table_args__ = (Index("idx_users_email", "email"),)
+    __table_args__ = (
+        Index("idx_users_email", "email"),
+        Index("idx_users_telegram_chat_id", "telegram_chat_id", unique=True),
+    )
 
     def __repr__(self) -> str:
         return f"<User(id={self.id}, email={self.email})>"
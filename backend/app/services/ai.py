@@ -2,6 +2,7 @@ import httpx
 import json
 import os
 from pathlib import Path
+from typing import Optional
 
 from app.config import get_settings
 
@@ -29,6 +30,37 @@ def load_prompt_files():
 
 SANDY_BASE_PROMPT = load_prompt_files()
 
+# Fallback to minimal prompt if files not found
+FALLBACK_PROMPT = """You are Sandy, Jens's personal assistant.
+        
+You're confident, direct, and warm. You help Jens manage his ADHD brain by being his accountability partner.
+
+Key rules:
+- Always acknowledge what he just said
+- Never hallucinate - only reference actual data
+- Keep responses short (1-3 sentences)
+- Learn from every interaction
+"""
+
+# The persona never changes between calls: it's assembled once and every
+# system prompt starts with exactly these bytes. Only the situation block
+# after it is rendered per call.
+SYSTEM_PROMPT_PREFIX = SANDY_BASE_PROMPT or FALLBACK_PROMPT
+
+SITUATION_HEADER = """
+
+═══════════════════════════════════════════════════════════════════
+📊 CURRENT SITUATION (USE THIS DATA)
+═══════════════════════════════════════════════════════════════════
+
+"""
+
+SITUATION_FOOTER = """
+
+THIS IS YOUR ACTUAL DATA. USE IT. Don't make things up.
+═══════════════════════════════════════════════════════════════════
+"""
+
 
 def build_system_prompt(user_profile: dict) -> str:
     """
@@ -46,105 +78,37 @@ def build_system_prompt(user_profile: dict) -> str:
 def build_comprehensive_system_prompt(user_profile: dict, context: dict) -> str:
     """
     Build the complete Sandy personality with learned context.
-    Loads from SANDY_SYSTEM_PROMPT_FULL.md + SANDY_SYSTEM_PROMPT_PART2.md
-    """
     
-    # Use loaded prompt files if available
-    if SANDY_BASE_PROMPT:
-        base_prompt = SANDY_BASE_PROMPT
-    else:
-        # Fallback to minimal prompt if files not found
-        base_prompt = """You are Sandy, Jens's personal assistant.
-        
-You're confident, direct, and warm. You help Jens manage his ADHD brain by being his accountability partner.
-
-Key rules:
-- Always acknowledge what he just said
-- Never hallucinate - only reference actual data
-- Keep responses short (1-3 sentences)
-- Learn from every interaction
-"""
-    
-    # Extract learned patterns from context
-    learned_section = ""
-    if context.get("learned_patterns"):
-        learned_section = "\n\n═══════════════════════════════════════════════════════════════════\n"
-        learned_section += "WHAT YOU KNOW ABOUT JENS (Learned Patterns):\n"
-        learned_section += "═══════════════════════════════════════════════════════════════════\n\n"
-        for p in context["learned_patterns"][:15]:
-            learned_section += f"  • [{p['category']}] {p['hypothesis']} (confidence: {p['confidence']}%)\n"
-    
-    # Extract exploration status
-    exploration_section = ""
-    if context.get("exploration_status"):
-        exploration_section = "\n\nAREAS YOU'RE STILL LEARNING:\n"
-        for t in context["exploration_status"][:10]:
-            category_name = t['category'].replace('_', ' ').title()
-            exploration_section += f"  • {category_name}: {t['confidence']}% confident\n"
-    
-    # Add current context data
-    context_section = ""
-    if context.get("tasks") or context.get("projects"):
-        context_section = "\n\n═══════════════════════════════════════════════════════════════════\n"
-        context_section += "CURRENT CONTEXT DATA:\n"
-        context_section += "═══════════════════════════════════════════════════════════════════\n\n"
-        
-        if context.get("tasks"):
-            context_section += f"Tasks: {len(context['tasks'])} active\n"
-        if context.get("projects"):
-            context_section += f"Projects: {len(context['projects'])} active\n"
-        if context.get("capacity_analysis"):
-            cap = context['capacity_analysis']
-            context_section += f"\nCapacity: {cap.get('available_hours', 0):.1f}h available, "
-            context_section += f"{cap.get('required_hours', 0):.1f}h required\n"
+    The precomputed persona (SANDY_SYSTEM_PROMPT_FULL.md +
+    SANDY_SYSTEM_PROMPT_PART2.md) followed by the current situation.
+    Learned patterns, exploration status, tasks and projects are rendered
+    once, by format_context_for_prompt.
+    """
+    if not context:
+        return SYSTEM_PROMPT_PREFIX
     
-    return base_prompt + learned_section + exploration_section + context_section
+    from app.services.context import format_context_for_prompt
+    return "".join((
+        SYSTEM_PROMPT_PREFIX,
+        SITUATION_HEADER,
+        format_context_for_prompt(context),
+        SITUATION_FOOTER
+    ))
 
 
-def get_ai_response(
+def build_messages(
     user_message: str,
-    user_id: int,
-    db,
     conversation_history: list = None,
-    context: dict = None,
-    relevant_memories: list = None
-) -> str:
-    """
-    Get AI response from Together AI using Llama 3.3 70B.
-    Now includes learned patterns and memory integration.
-    """
-    
-    settings = get_settings()
+    context: dict = None
+) -> list:
+    """Build the chat messages (system prompt, history, new message) for Together AI."""
     
     if conversation_history is None:
         conversation_history = []
     
-    if context is None:
-        context = {}
-    
-    # Format context as text for prompt
-    from app.services.context import format_context_for_prompt
-    context_text = format_context_for_prompt(context) if context else ""
-    
-    # Build system prompt with memory integration AND formatted context
-    system_prompt = build_comprehensive_system_prompt({}, context)
-    
-    # Add the ACTUAL CONTEXT DATA prominently
-    full_prompt = f"""{system_prompt}
-
-═══════════════════════════════════════════════════════════════════
-📊 CURRENT SITUATION (USE THIS DATA)
-═══════════════════════════════════════════════════════════════════
-
-{context_text}
-
-THIS IS YOUR ACTUAL DATA. USE IT. Don't make things up.
-═══════════════════════════════════════════════════════════════════
-"""
-    
     # Build messages
     messages = [
-        {"role": "system", "content": full_prompt}
+        {"role": "system", "content": build_comprehensive_system_prompt({}, context)}
     ]
     
     # Add conversation history
@@ -160,22 +124,86 @@ THIS IS YOUR ACTUAL DATA. USE IT. Don't make things up.
         "content": user_message
     })
     
+    return messages
+
+
+# Shared Together AI client - reuses TCP/TLS connections across replies
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the pooled Together AI client."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        settings = get_settings()
+        _http_client = httpx.AsyncClient(
+            http2=settings.together_http2,
+            limits=httpx.Limits(
+                max_connections=settings.together_max_connections,
+                max_keepalive_connections=settings.together_max_keepalive_connections,
+                keepalive_expiry=settings.together_keepalive_expiry_seconds
+            ),
+            timeout=httpx.Timeout(
+                settings.together_read_timeout_seconds,
+                connect=settings.together_connect_timeout_seconds
+            )
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the pooled client (called on bot shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _request_headers(settings) -> dict:
+    return {
+        "Authorization": f"Bearer {settings.together_api_key}",
+        "Content-Type": "application/json"
+    }
+
+
+def _request_body(messages: list, stream: bool = False) -> dict:
+    body = {
+        "model": MODEL,
+        "messages": messages,
+        "temperature": 0.7,
+        "max_tokens": 500,
+        "top_p": 0.9
+    }
+    if stream:
+        body["stream"] = True
+    return body
+
+
+async def get_ai_response(
+    user_message: str,
+    user_id: int,
+    conversation_history: list = None,
+    context: dict = None,
+    relevant_memories: list = None
+) -> str:
+    """
+    Get AI response from Together AI using Llama 3.3 70B.
+    Now includes learned patterns and memory integration.
+    
+    Async so a slow completion only suspends the calling handler,
+    not the whole bot.
+    """
+    
+    settings = get_settings()
+    
+    messages = build_messages(user_message, conversation_history, context)
+    
     # Call Together AI
     try:
-        response = httpx.post(
+        response = await get_http_client().post(
             TOGETHER_API_URL,
-            headers={
-                "Authorization": f"Bearer {settings.together_api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": MODEL,
-                "messages": messages,
-                "temperature": 0.7,
-                "max_tokens": 500,
-                "top_p": 0.9
-            },
-            timeout=30.0
+            headers=_request_headers(settings),
+            json=_request_body(messages)
         )
         
         response.raise_for_status()
@@ -186,3 +214,49 @@ THIS IS YOUR ACTUAL DATA. USE IT. Don't make things up.
     except Exception as e:
         print(f"Error calling Together AI: {e}")
         return "Sorry, I'm having trouble connecting right now. Can you try again?"
+
+
+async def stream_ai_response(
+    user_message: str,
+    user_id: int,
+    conversation_history: list = None,
+    context: dict = None,
+    relevant_memories: list = None
+):
+    """
+    Stream the Together AI completion, yielding text deltas as they arrive.
+    
+    Same prompt as get_ai_response, but reads the server-sent event stream
+    so the first words can be shown long before generation finishes.
+    Errors are raised to the caller, which decides what to show.
+    """
+    
+    settings = get_settings()
+    
+    messages = build_messages(user_message, conversation_history, context)
+    
+    async with get_http_client().stream(
+        "POST",
+        TOGETHER_API_URL,
+        headers=_request_headers(settings),
+        json=_request_body(messages, stream=True)
+    ) as response:
+        response.raise_for_status()
+        
+        async for line in response.aiter_lines():
+            # SSE frames look like "data: {...}"; blank lines separate events
+            if not line.startswith("data:"):
+                continue
+            
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            
+            chunk = json.loads(data)
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                yield delta
@@ -1,5 +1,7 @@
 """Context builders - get current state for AI responses."""
-from datetime import datetime, timedelta
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.project import Project, ProjectStatus
@@ -10,95 +12,40 @@ from app.services.time_intelligence import TimeIntelligence
 from app.services.pattern_recognition import PatternRecognizer
 
 
-def build_context_for_ai(user_id: int, db: Session, include_intelligence: bool = True) -> dict:
-    """
-    Build context about user's current projects, tasks, backburner items, AND learned patterns.
-    This gets passed to the AI so it knows what the user is working on and what it has learned.
-    
-    Args:
-        user_id: User ID
-        db: Database session
-        include_intelligence: Include time intelligence and pattern recognition (default: True)
-    """
-    
-    # Get active projects
-    active_projects = db.query(Project).filter(
+def _projects_query(user_id: int):
+    """Active projects, nearest deadline first."""
+    return select(Project).where(
         Project.user_id == user_id,
         Project.status == ProjectStatus.ACTIVE
-    ).order_by(Project.deadline.asc().nullslast()).all()
-    
-    # Get all incomplete tasks
-    incomplete_tasks = db.query(Task).filter(
-        Task.user_id == user_id,
-        Task.status != TaskStatus.DONE
-    ).order_by(Task.due_date.asc().nullslast(), Task.priority.desc()).all()
-    
-    # Get backburner items
-    backburner = db.query(BackburnerItem).filter(
-        BackburnerItem.user_id == user_id
-    ).order_by(BackburnerItem.created_at.desc()).limit(5).all()
-    
-    # MEMORY: Get confirmed patterns from NEW pattern system
-    from app.services.pattern_learning import PatternLearningService
-    from app.services.exploration import ExplorationService
-    
-    learner = PatternLearningService(user_id, db)
-    explorer = ExplorationService(user_id, db)
-    
-    # Get high confidence patterns (80%+)
-    confirmed_patterns = learner.get_confirmed_patterns(min_confidence=80)
-    
-    # Get exploration status (categories still learning)
-    exploration_categories = explorer.get_all_categories_status()
-    learning_categories = [c for c in exploration_categories if c['confidence'] < 80]
-    
-    # Format for AI
-    context = {
-        "current_date": datetime.utcnow().strftime("%Y-%m-%d"),
-        "active_projects": [],
-        "tasks": [],
-        "backburner": [],
-        "learned_patterns": [],
-        "exploration_status": []
-    }
-    
-    # Add intelligence if requested
-    if include_intelligence:
-        time_intel = TimeIntelligence(user_id, db)
-        pattern_recognizer = PatternRecognizer(user_id, db)
-        
-        # Capacity analysis
-        capacity = time_intel.get_capacity_summary()
-        context["capacity"] = capacity
-        
-        # Pattern insights
-        patterns = pattern_recognizer.detect_repeated_intentions(days=7)
-        if patterns:
-            context["patterns"] = patterns
-        
-        completion_stats = pattern_recognizer.analyze_task_completion_rate(days=30)
-        context["completion_stats"] = completion_stats
-        
-        # Accountability message
-        accountability = pattern_recognizer.generate_accountability_message()
-        if accountability:
-            context["accountability_message"] = accountability
-    
-    # Format projects
+    ).order_by(Project.deadline.asc().nullslast())
+
+
+def _projects_rows(active_projects) -> dict:
+    projects = []
     for project in active_projects:
-        project_data = {
+        projects.append({
             "id": project.id,
             "title": project.name,  # Project model uses 'name' not 'title'
             "description": project.description,
             "deadline": project.deadline.strftime("%Y-%m-%d") if project.deadline else None,
             "estimated_hours": project.estimated_hours,
             "days_until_deadline": (project.deadline - datetime.utcnow()).days if project.deadline else None
-        }
-        context["active_projects"].append(project_data)
-    
-    # Format tasks
+        })
+    return {"active_projects": projects}
+
+
+def _tasks_query(user_id: int):
+    """All incomplete tasks."""
+    return select(Task).where(
+        Task.user_id == user_id,
+        Task.status != TaskStatus.DONE
+    ).order_by(Task.due_date.asc().nullslast(), Task.priority.desc())
+
+
+def _tasks_rows(incomplete_tasks) -> dict:
+    tasks = []
     for task in incomplete_tasks:
-        task_data = {
+        tasks.append({
             "id": task.id,
             "title": task.title,
             "description": task.description,
@@ -108,35 +55,159 @@ def build_context_for_ai(user_id: int, db: Session, include_intelligence: bool =
             "status": task.status.value,
             "project_id": task.project_id,
             "due_date": task.due_date.strftime("%Y-%m-%d") if task.due_date else None
-        }
-        context["tasks"].append(task_data)
-    
-    # Format backburner
-    for item in backburner:
-        context["backburner"].append({
+        })
+    return {"tasks": tasks}
+
+
+def _backburner_query(user_id: int):
+    """Five most recent backburner items."""
+    return select(BackburnerItem).where(
+        BackburnerItem.user_id == user_id
+    ).order_by(BackburnerItem.created_at.desc()).limit(5)
+
+
+def _backburner_rows(backburner) -> dict:
+    return {"backburner": [
+        {
             "id": item.id,
             "title": item.title,
             "description": item.description,
             "reason": item.reason
-        })
-    
-    # Format confirmed patterns from NEW system
-    for pattern in confirmed_patterns:
-        context["learned_patterns"].append({
-            "category": pattern['category'],
-            "hypothesis": pattern['hypothesis'],
-            "confidence": pattern['confidence']
-        })
-    
-    # Format exploration status from NEW system
-    for category in learning_categories[:5]:  # Top 5 categories still learning
-        context["exploration_status"].append({
-            "category": category['category'],
-            "description": category['description'],
-            "confidence": category['confidence'],
-            "observations": category['observations']
-        })
-    
+        }
+        for item in backburner
+    ]}
+
+
+def _query_section(query, rows):
+    """Sync and async builders for a section that is one select() shaped into a dict."""
+    def build(user_id: int, db: Session) -> dict:
+        return rows(db.scalars(query(user_id)).all())
+
+    async def abuild(user_id: int, session: AsyncSession) -> dict:
+        return rows((await session.scalars(query(user_id))).all())
+
+    build.__doc__ = abuild.__doc__ = query.__doc__
+    return build, abuild
+
+
+def _run_sync_section(build):
+    """Async builder for a service-backed section: runs it on the async connection."""
+    async def abuild(user_id: int, session: AsyncSession) -> dict:
+        return await session.run_sync(lambda db: build(user_id, db))
+
+    abuild.__doc__ = build.__doc__
+    return abuild
+
+
+_projects_section, _aprojects_section = _query_section(_projects_query, _projects_rows)
+_tasks_section, _atasks_section = _query_section(_tasks_query, _tasks_rows)
+_backburner_section, _abackburner_section = _query_section(_backburner_query, _backburner_rows)
+
+
+def _patterns_section(user_id: int, db: Session) -> dict:
+    """Confirmed patterns and categories still being explored."""
+    # MEMORY: Get confirmed patterns from NEW pattern system
+    from app.services.pattern_learning import PatternLearningService
+    from app.services.exploration import ExplorationService
+
+    learner = PatternLearningService(user_id, db)
+    explorer = ExplorationService(user_id, db)
+
+    # Get high confidence patterns (80%+)
+    confirmed_patterns = learner.get_confirmed_patterns(min_confidence=80)
+
+    # Get exploration status (categories still learning)
+    exploration_categories = explorer.get_all_categories_status()
+    learning_categories = [c for c in exploration_categories if c['confidence'] < 80]
+
+    return {
+        "learned_patterns": [
+            {
+                "category": pattern.category,
+                "hypothesis": pattern.hypothesis,
+                "confidence": pattern.confidence
+            }
+            for pattern in confirmed_patterns
+        ],
+        "exploration_status": [
+            {
+                "category": category['category'],
+                "description": category['description'],
+                "confidence": category['confidence'],
+                "observations": category['observations']
+            }
+            for category in learning_categories[:5]  # Top 5 categories still learning
+        ]
+    }
+
+
+def _intelligence_section(user_id: int, db: Session) -> dict:
+    """Time intelligence and pattern recognition."""
+    time_intel = TimeIntelligence(user_id, db)
+    pattern_recognizer = PatternRecognizer(user_id, db)
+
+    # Capacity analysis
+    section = {"capacity": time_intel.get_capacity_summary()}
+
+    # Pattern insights
+    patterns = pattern_recognizer.detect_repeated_intentions(days=7)
+    if patterns:
+        section["patterns"] = patterns
+
+    section["completion_stats"] = pattern_recognizer.analyze_task_completion_rate(days=30)
+    section["recent_activity"] = pattern_recognizer.summarize_recent_activity(days=7)
+
+    # Accountability message
+    accountability = pattern_recognizer.generate_accountability_message()
+    if accountability:
+        section["accountability_message"] = accountability
+
+    return section
+
+
+# (name, data sources it reads, builder, async builder) - sources are data_versions keys
+CONTEXT_SECTIONS = (
+    ("projects", ("projects",), _projects_section, _aprojects_section),
+    ("tasks", ("tasks",), _tasks_section, _atasks_section),
+    ("backburner", ("backburner",), _backburner_section, _abackburner_section),
+    ("patterns", ("patterns",), _patterns_section, _run_sync_section(_patterns_section)),
+    (
+        "intelligence",
+        ("conversations", "tasks", "projects", "rollups"),
+        _intelligence_section,
+        _run_sync_section(_intelligence_section)
+    ),
+)
+
+
+def build_context_for_ai(user_id: int, db: Session, include_intelligence: bool = True) -> dict:
+    """
+    Build context about user's current projects, tasks, backburner items, AND learned patterns.
+    This gets passed to the AI so it knows what the user is working on and what it has learned.
+
+    Always queries the database; the message path uses the cached
+    snapshot from context_cache.get_cached_context instead.
+
+    Args:
+        user_id: User ID
+        db: Database session
+        include_intelligence: Include time intelligence and pattern recognition (default: True)
+    """
+    context = {"current_date": datetime.utcnow().strftime("%Y-%m-%d")}
+    for name, _, builder, _ in CONTEXT_SECTIONS:
+        if name == "intelligence" and not include_intelligence:
+            continue
+        context.update(builder(user_id, db))
+    return context
+
+
+async def abuild_context_for_ai(user_id: int, session: AsyncSession, include_intelligence: bool = True) -> dict:
+    """build_context_for_ai on an AsyncSession."""
+    context = {"current_date": datetime.utcnow().strftime("%Y-%m-%d")}
+    for name, _, _, abuilder in CONTEXT_SECTIONS:
+        if name == "intelligence" and not include_intelligence:
+            continue
+        context.update(await abuilder(user_id, session))
     return context
 
 
@@ -152,7 +223,7 @@ def format_context_for_prompt(context: dict) -> str:
     if context.get("learned_patterns"):
         lines.append("WORKING HYPOTHESES ABOUT JENS (Stay curious, invite challenge):")
         lines.append("")
-        for p in context["learned_patterns"][:10]:
+        for p in context["learned_patterns"][:15]:
             category_name = p['category'].replace('_', ' ').title()
             confidence = p['confidence']
             
@@ -190,6 +261,18 @@ def format_context_for_prompt(context: dict) -> str:
             lines.append(f"  Recommendation: {cap['recommendation']}")
         lines.append("")
     
+    # Recent activity (daily rollups)
+    activity = context.get("recent_activity")
+    if activity and activity["messages"]:
+        lines.append(f"LAST {activity['days']} DAYS:")
+        lines.append(
+            f"  {activity['tasks_completed']} tasks completed, {activity['work_sessions']} work sessions "
+            f"({activity['focus_minutes']} min focused), {activity['checkins']} check-ins"
+        )
+        if activity.get("avg_energy") is not None:
+            lines.append(f"  Average energy: {activity['avg_energy']}/10")
+        lines.append("")
+    
     # Accountability patterns
     if context.get("accountability_message"):
         lines.append("PATTERN ALERT:")
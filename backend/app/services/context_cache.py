@@ -0,0 +1,144 @@
+"""
+Per-user cache of the AI context snapshot.
+
+build_context_for_ai runs a handful of queries per section on every message,
+although projects, tasks and patterns rarely change between two messages.
+The snapshot here is kept per user and per section: each section remembers
+the data_versions it was built from and is rebuilt only when one of them
+moved (or its TTL ran out, for "days until deadline"-style fields and writes
+made by other processes). In the steady state a message costs a few dict
+lookups.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.services import data_versions
+from app.services.context import CONTEXT_SECTIONS
+
+
+class _Section:
+    __slots__ = ("versions", "built_at", "data")
+
+    def __init__(self, versions: Tuple[int, ...], built_at: float, data: dict):
+        self.versions = versions
+        self.built_at = built_at
+        self.data = data
+
+
+class ContextSnapshotCache:
+    """LRU of per-user context sections, validated against data_versions."""
+
+    def __init__(self, ttl_seconds: float = 300.0, max_users: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self._users: "OrderedDict[int, Dict[str, _Section]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.rebuilds = 0
+
+    def get(self, user_id: int, db: Session, include_intelligence: bool = True) -> dict:
+        """
+        Same shape as build_context_for_ai. The returned dict is fresh, but
+        the section lists inside it are shared - treat them as read-only.
+        """
+        context = {"current_date": datetime.utcnow().strftime("%Y-%m-%d")}
+        now = time.monotonic()
+
+        for name, sources, builder, _ in self._sections(include_intelligence):
+            section, current = self._fresh(user_id, name, sources, now)
+            if section is None:
+                section = self._rebuilt(user_id, name, current, now, builder(user_id, db))
+            context.update(section.data)
+
+        return context
+
+    async def aget(self, user_id: int, session: AsyncSession, include_intelligence: bool = True) -> dict:
+        """get() with stale sections rebuilt on an AsyncSession."""
+        context = {"current_date": datetime.utcnow().strftime("%Y-%m-%d")}
+        now = time.monotonic()
+
+        for name, sources, _, abuilder in self._sections(include_intelligence):
+            section, current = self._fresh(user_id, name, sources, now)
+            if section is None:
+                section = self._rebuilt(user_id, name, current, now, await abuilder(user_id, session))
+            context.update(section.data)
+
+        return context
+
+    @staticmethod
+    def _sections(include_intelligence: bool):
+        return [s for s in CONTEXT_SECTIONS if include_intelligence or s[0] != "intelligence"]
+
+    def _fresh(self, user_id: int, name: str, sources, now: float) -> Tuple[Optional[_Section], Tuple[int, ...]]:
+        """The cached section if still valid (else None), and the current versions."""
+        # Read versions before querying: a write that commits mid-build
+        # leaves this entry behind the counters, so the next call rebuilds.
+        current = data_versions.versions(user_id, sources)
+        section = self._lookup(user_id, name)
+        if section is None or section.versions != current or now - section.built_at > self.ttl_seconds:
+            return None, current
+        self.hits += 1
+        return section, current
+
+    def _rebuilt(self, user_id: int, name: str, versions: Tuple[int, ...], now: float, data: dict) -> _Section:
+        section = _Section(versions, now, data)
+        self._store(user_id, name, section)
+        self.rebuilds += 1
+        return section
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Drop one user's snapshot (or everyone's)."""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def _lookup(self, user_id: int, name: str) -> Optional[_Section]:
+        with self._lock:
+            sections = self._users.get(user_id)
+            if sections is None:
+                return None
+            self._users.move_to_end(user_id)
+            return sections.get(name)
+
+    def _store(self, user_id: int, name: str, section: _Section):
+        with self._lock:
+            self._users.setdefault(user_id, {})[name] = section
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+
+# Singleton instance
+_context_cache: Optional[ContextSnapshotCache] = None
+
+
+def get_context_cache() -> ContextSnapshotCache:
+    """Get or create the context snapshot cache singleton"""
+    global _context_cache
+    if _context_cache is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _context_cache = ContextSnapshotCache(
+            ttl_seconds=settings.context_cache_ttl_seconds,
+            max_users=settings.context_cache_max_users
+        )
+    return _context_cache
+
+
+def get_cached_context(user_id: int, db: Session, include_intelligence: bool = True) -> dict:
+    """build_context_for_ai, served from the per-user snapshot when unchanged."""
+    return get_context_cache().get(user_id, db, include_intelligence)
+
+
+async def aget_cached_context(user_id: int, session: AsyncSession, include_intelligence: bool = True) -> dict:
+    """abuild_context_for_ai, served from the per-user snapshot when unchanged."""
+    return await get_context_cache().aget(user_id, session, include_intelligence)
@@ -0,0 +1,84 @@
+"""
+Per-user change counters for cache invalidation.
+
+Mapper events note every insert/update/delete of a tracked model against its
+(user_id, source); when the session commits, those counters are bumped.
+Caches remember the versions they were built from and rebuild a piece only
+when its versions moved - no hand-placed invalidation calls needed.
+
+Writes that bypass the ORM unit of work (bulk ``insert()`` statements) must
+call ``mark_changed`` themselves.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.models.backburner import BackburnerItem
+from app.models.conversation import Conversation
+from app.models.intention import IntentionMention
+from app.models.pattern_tracking import PatternCategory, PatternHypothesis, PatternObservation
+from app.models.project import Project
+from app.models.task import Task
+from app.models.user import User
+
+_versions: Dict[Tuple[int, str], int] = defaultdict(int)
+_lock = threading.Lock()
+
+_PENDING_KEY = "data_versions_pending"
+
+
+def bump(user_id: int, source: str):
+    """Record that ``source`` data for ``user_id`` changed."""
+    with _lock:
+        _versions[(user_id, source)] += 1
+
+
+def versions(user_id: int, sources: Iterable[str]) -> Tuple[int, ...]:
+    """Current counters for ``sources`` (compare to detect changes)."""
+    with _lock:
+        return tuple(_versions[(user_id, source)] for source in sources)
+
+
+def mark_changed(session: Session, user_id: int, source: str):
+    """Bump ``source`` for ``user_id`` when ``session`` commits."""
+    session.info.setdefault(_PENDING_KEY, set()).add((user_id, source))
+
+
+def _track(model, source: str, user_attr: str = "user_id"):
+    def _on_change(mapper, connection, target):
+        user_id = getattr(target, user_attr)
+        session = object_session(target)
+        if session is None:
+            bump(user_id, source)
+        else:
+            mark_changed(session, user_id, source)
+
+    for event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, event_name, _on_change)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    # Bump only once the change is visible to other sessions, so a reader
+    # can never cache pre-commit data under the new version.
+    for user_id, source in session.info.pop(_PENDING_KEY, ()):
+        bump(user_id, source)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+_track(Task, "tasks")
+_track(Project, "projects")
+_track(BackburnerItem, "backburner")
+_track(PatternCategory, "patterns")
+_track(PatternObservation, "patterns")
+_track(PatternHypothesis, "patterns")
+_track(Conversation, "conversations")
+_track(IntentionMention, "conversations")
+_track(User, "profile", user_attr="id")
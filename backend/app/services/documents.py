@@ -2,6 +2,10 @@
 Document processing service for uploaded files and URLs.
 Extracts text and stores in Pinecone for RAG.
 """
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+import hashlib
+import logging
 from pypdf import PdfReader
 from docx import Document
 import io
@@ -10,6 +14,15 @@ from bs4 import BeautifulSoup
 
 from app.services.memory import get_memory_service
 
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000  # characters per stored chunk
+EMBED_BATCH_SIZE = 64  # chunks per embeddings request / vector upsert
+MAX_CONCURRENT_BATCHES = 4  # batches in flight at once
+
+# progress(chunks_done, chunks_total)
+ProgressCallback = Callable[[int, int], None]
+
 
 class DocumentService:
     def __init__(self):
@@ -68,12 +81,91 @@ class DocumentService:
         except Exception as e:
             raise Exception(f"Failed to fetch URL: {str(e)}")
     
+    def _ingest_chunks(
+        self,
+        chunks: list,
+        vector_id: Callable[[int], str],
+        metadata: Callable[[int, str], dict],
+        progress: Optional[ProgressCallback] = None,
+        resume: bool = False
+    ) -> dict:
+        """
+        Embed and upsert chunks in batches, several batches at a time.
+        
+        Each batch is one embeddings request plus one multi-vector upsert.
+        A failed batch doesn't stop the others; its chunk indexes are
+        reported so the caller can re-run with ``resume=True``, which skips
+        chunks whose vectors already exist.
+        """
+        index = self.memory_service.index
+        
+        def run_batch(batch: list) -> tuple:
+            pending = batch
+            if resume:
+                existing = index.fetch(ids=[vector_id(i) for i in batch]).vectors
+                pending = [i for i in batch if vector_id(i) not in existing]
+            
+            if pending:
+                embeddings = self.memory_service.create_embeddings([chunks[i] for i in pending])
+                index.upsert(vectors=[
+                    {"id": vector_id(i), "values": embedding, "metadata": metadata(i, chunks[i])}
+                    for i, embedding in zip(pending, embeddings)
+                ])
+            return len(pending), len(batch) - len(pending)
+        
+        batches = [
+            list(range(start, min(start + EMBED_BATCH_SIZE, len(chunks))))
+            for start in range(0, len(chunks), EMBED_BATCH_SIZE)
+        ]
+        stored = skipped = done = 0
+        failed = []
+        
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_BATCHES) as pool:
+            futures = {pool.submit(run_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    batch_stored, batch_skipped = future.result()
+                    stored += batch_stored
+                    skipped += batch_skipped
+                except Exception as e:
+                    logger.warning(f"Chunk batch {batch[0]}-{batch[-1]} failed: {e}")
+                    failed.extend(batch)
+                
+                done += len(batch)
+                if progress:
+                    progress(done, len(chunks))
+        
+        return {
+            "chunks_stored": stored,
+            "chunks_skipped": skipped,
+            "failed_chunks": sorted(failed)
+        }
+    
+    def _ingest_result(self, ingest: dict, total_chunks: int, **info) -> dict:
+        """Shape the process_* return value; partial failures are resumable."""
+        result = {
+            "success": not ingest["failed_chunks"],
+            "chunks_stored": ingest["chunks_stored"],
+            "chunks_skipped": ingest["chunks_skipped"],
+            **info
+        }
+        if ingest["failed_chunks"]:
+            result["failed_chunks"] = ingest["failed_chunks"]
+            result["error"] = (
+                f"{len(ingest['failed_chunks'])} of {total_chunks} chunks failed - "
+                "retry with resume=True to store only the missing ones"
+            )
+        return result
+    
     def process_document(
         self,
         file_bytes: bytes,
         filename: str,
         user_id: int,
-        doc_type: str = "personal"  # "personal" or "research"
+        doc_type: str = "personal",  # "personal" or "research"
+        progress: Optional[ProgressCallback] = None,
+        resume: bool = False
     ) -> dict:
         """
         Process uploaded document and store in Pinecone.
@@ -83,6 +175,8 @@ class DocumentService:
             filename: Original filename
             user_id: User ID
             doc_type: Type of document ("personal" or "research")
+            progress: Optional callback(chunks_done, chunks_total)
+            resume: Skip chunks already stored by an earlier, partly failed run
         
         Returns:
             dict with status and extracted text info
@@ -110,38 +204,30 @@ class DocumentService:
                 }
             
             # Split into chunks (for long documents)
-            chunk_size = 1000
-            chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
+            chunks = [text[i:i+CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
             
-            # Store each chunk in Pinecone
-            for i, chunk in enumerate(chunks):
-                doc_id = f"doc_{user_id}_{filename}_{i}"
-                
-                # Create embedding
-                embedding = self.memory_service.create_embedding(chunk)
-                
-                # Store in Pinecone with metadata
-                self.memory_service.index.upsert(
-                    vectors=[{
-                        "id": doc_id,
-                        "values": embedding,
-                        "metadata": {
-                            "user_id": user_id,
-                            "doc_type": doc_type,
-                            "filename": filename,
-                            "chunk_index": i,
-                            "text": chunk[:500],  # First 500 chars for reference
-                            "full_text": chunk,
-                        }
-                    }]
-                )
+            # Embed + store chunks in batches
+            ingest = self._ingest_chunks(
+                chunks,
+                vector_id=lambda i: f"doc_{user_id}_{filename}_{i}",
+                metadata=lambda i, chunk: {
+                    "user_id": user_id,
+                    "doc_type": doc_type,
+                    "filename": filename,
+                    "chunk_index": i,
+                    "text": chunk[:500],  # First 500 chars for reference
+                    "full_text": chunk,
+                },
+                progress=progress,
+                resume=resume
+            )
             
-            return {
-                "success": True,
-                "chunks_stored": len(chunks),
-                "total_chars": len(text),
-                "doc_type": doc_type
-            }
+            return self._ingest_result(
+                ingest,
+                len(chunks),
+                total_chars=len(text),
+                doc_type=doc_type
+            )
             
         except Exception as e:
             return {
@@ -153,7 +239,9 @@ class DocumentService:
         self,
         url: str,
         user_id: int,
-        doc_type: str = "research"
+        doc_type: str = "research",
+        progress: Optional[ProgressCallback] = None,
+        resume: bool = False
     ) -> dict:
         """
         Process URL content and store in Pinecone.
@@ -162,6 +250,8 @@ class DocumentService:
             url: URL to fetch
             user_id: User ID
             doc_type: Type of document ("personal" or "research")
+            progress: Optional callback(chunks_done, chunks_total)
+            resume: Skip chunks already stored by an earlier, partly failed run
         
         Returns:
             dict with status and extracted text info
@@ -177,40 +267,35 @@ class DocumentService:
                 }
             
             # Split into chunks
-            chunk_size = 1000
-            chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
+            chunks = [text[i:i+CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
             
-            # Store each chunk in Pinecone
-            for i, chunk in enumerate(chunks):
-                doc_id = f"url_{user_id}_{hash(url)}_{i}"
-                
-                # Create embedding
-                embedding = self.memory_service.create_embedding(chunk)
-                
-                # Store in Pinecone with metadata
-                self.memory_service.index.upsert(
-                    vectors=[{
-                        "id": doc_id,
-                        "values": embedding,
-                        "metadata": {
-                            "user_id": user_id,
-                            "doc_type": doc_type,
-                            "source_url": url,
-                            "title": title,
-                            "chunk_index": i,
-                            "text": chunk[:500],
-                            "full_text": chunk,
-                        }
-                    }]
-                )
+            # Stable across processes (unlike hash()) so resume finds earlier chunks
+            url_key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
             
-            return {
-                "success": True,
-                "chunks_stored": len(chunks),
-                "total_chars": len(text),
-                "title": title,
-                "doc_type": doc_type
-            }
+            # Embed + store chunks in batches
+            ingest = self._ingest_chunks(
+                chunks,
+                vector_id=lambda i: f"url_{user_id}_{url_key}_{i}",
+                metadata=lambda i, chunk: {
+                    "user_id": user_id,
+                    "doc_type": doc_type,
+                    "source_url": url,
+                    "title": title,
+                    "chunk_index": i,
+                    "text": chunk[:500],
+                    "full_text": chunk,
+                },
+                progress=progress,
+                resume=resume
+            )
+            
+            return self._ingest_result(
+                ingest,
+                len(chunks),
+                total_chars=len(text),
+                title=title,
+                doc_type=doc_type
+            )
             
         except Exception as e:
             return {
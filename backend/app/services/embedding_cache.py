@@ -0,0 +1,193 @@
+"""
+Content-addressed cache for OpenAI embeddings.
+
+Keyed by (model, sha256(text)), so the same text is only ever embedded once
+per model: repeated short messages ("ok", "done"), re-ingested documents and
+re-stored conversations all reuse the stored vector.
+
+Two tiers:
+- an in-memory LRU for the hot set
+- a SQLite file that survives restarts
+
+Both tiers hold vectors as float32 arrays (~6 KB for 1536 dims, against ~49 KB
+as a list of Python floats), so the default 10k-entry LRU stays around 60 MB;
+callers get plain lists.
+"""
+import array
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+Embedder = Callable[[List[str]], List[List[float]]]
+AsyncEmbedder = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingCache:
+    """Two-tier (LRU + SQLite) embedding cache with hit/miss counters."""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._lru: "OrderedDict[Tuple[str, str], array.array]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " text_hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, text_hash))"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> Tuple[str, str]:
+        return model, hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._lru)
+        }
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached embeddings for ``texts`` (None where missing)."""
+        keys = [self.key(model, text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        with self._lock:
+            missing = []
+            for i, key in enumerate(keys):
+                vector = self._lru.get(key)
+                if vector is None:
+                    missing.append(i)
+                    continue
+                self._lru.move_to_end(key)
+                results[i] = vector.tolist()
+                self.memory_hits += 1
+
+            if missing and self._db is not None:
+                on_disk = self._load([keys[i] for i in missing])
+                still_missing = []
+                for i in missing:
+                    vector = on_disk.get(keys[i])
+                    if vector is None:
+                        still_missing.append(i)
+                        continue
+                    results[i] = vector.tolist()
+                    self._remember(keys[i], vector)
+                    self.disk_hits += 1
+                missing = still_missing
+
+            self.misses += len(missing)
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]):
+        """Store freshly created embeddings in both tiers."""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, embeddings):
+                key = self.key(model, text)
+                packed = array.array("f", vector)
+                self._remember(key, packed)
+                rows.append((key[0], key[1], packed.tobytes()))
+
+            if self._db is not None and rows:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                    rows
+                )
+                self._db.commit()
+
+    def get_or_create(self, model: str, texts: List[str], create: Embedder) -> List[List[float]]:
+        """Embeddings for ``texts``, calling ``create`` once for the uncached (deduplicated) ones."""
+        results = self.get_many(model, texts)
+        missing = self._unique_missing(texts, results)
+        if missing:
+            self._fill(model, texts, results, missing, create(missing))
+        return results
+
+    async def aget_or_create(self, model: str, texts: List[str], create: AsyncEmbedder) -> List[List[float]]:
+        """Async get_or_create; the SQLite lookup runs in a worker thread."""
+        results = await asyncio.to_thread(self.get_many, model, texts)
+        missing = self._unique_missing(texts, results)
+        if missing:
+            embeddings = await create(missing)
+            await asyncio.to_thread(self._fill, model, texts, results, missing, embeddings)
+        return results
+
+    def warm(self, model: str, texts: List[str], create: Embedder, batch_size: int = 64) -> int:
+        """Bulk-load embeddings for ``texts``; returns how many had to be created."""
+        created = 0
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            missing = self._unique_missing(batch, self.get_many(model, batch))
+            if missing:
+                self.put_many(model, missing, create(missing))
+                created += len(missing)
+        return created
+
+    def _unique_missing(self, texts: List[str], results: List[Optional[List[float]]]) -> List[str]:
+        return list(dict.fromkeys(text for text, vector in zip(texts, results) if vector is None))
+
+    def _fill(self, model, texts, results, missing, embeddings):
+        self.put_many(model, missing, embeddings)
+        created = dict(zip(missing, embeddings))
+        for i, text in enumerate(texts):
+            if results[i] is None:
+                results[i] = created[text]
+
+    def _remember(self, key, vector):
+        # Caller holds self._lock
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _load(self, keys) -> Dict:
+        # Caller holds self._lock
+        found = {}
+        for model, text_hash in keys:
+            row = self._db.execute(
+                "SELECT vector FROM embeddings WHERE model = ? AND text_hash = ?",
+                (model, text_hash)
+            ).fetchone()
+            if row is not None:
+                found[(model, text_hash)] = array.array("f", row[0])
+        return found
+
+
+# Singleton instance
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get or create the embedding cache singleton"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _embedding_cache = EmbeddingCache(
+            path=settings.embedding_cache_path or None,
+            max_entries=settings.embedding_cache_size
+        )
+    return _embedding_cache
@@ -2,7 +2,7 @@
 from datetime import datetime
 from typing import Optional, List, Dict
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import and_, func, select
 
 from app.models.pattern_tracking import PatternCategory, PatternObservation, PatternHypothesis
 
@@ -14,6 +14,70 @@ class ExplorationService:
         self.user_id = user_id
         self.db = db
     
+    def _category_summaries(self, *criteria) -> List:
+        """
+        One row per category: observation count, primary hypothesis and
+        weakest hypothesis, fetched in a single query instead of 1 + 2N.
+
+        The primary hypothesis is the one flagged for exploration if any,
+        otherwise the most confident. Extra ``criteria`` filter categories.
+        """
+        obs_counts = (
+            select(
+                PatternObservation.category_id,
+                func.count(PatternObservation.id).label("observations")
+            )
+            .where(PatternObservation.user_id == self.user_id)
+            .group_by(PatternObservation.category_id)
+            .subquery()
+        )
+
+        ranked = (
+            select(
+                PatternHypothesis.category_id,
+                PatternHypothesis.hypothesis,
+                PatternHypothesis.confidence,
+                PatternHypothesis.needs_exploration,
+                func.row_number().over(
+                    partition_by=PatternHypothesis.category_id,
+                    order_by=(
+                        PatternHypothesis.needs_exploration.desc(),
+                        PatternHypothesis.confidence.desc(),
+                        PatternHypothesis.id
+                    )
+                ).label("primary_rank"),
+                func.row_number().over(
+                    partition_by=PatternHypothesis.category_id,
+                    order_by=(PatternHypothesis.confidence.asc(), PatternHypothesis.id)
+                ).label("weakest_rank")
+            )
+            .where(PatternHypothesis.user_id == self.user_id)
+            .cte("ranked_hypotheses")
+        )
+        primary = ranked.alias("primary_hypothesis")
+        weakest = ranked.alias("weakest_hypothesis")
+
+        return self.db.query(
+            PatternCategory.id.label("category_id"),
+            PatternCategory.category_name,
+            PatternCategory.description,
+            func.coalesce(obs_counts.c.observations, 0).label("observations"),
+            primary.c.hypothesis,
+            primary.c.confidence,
+            primary.c.needs_exploration,
+            weakest.c.hypothesis.label("weakest_hypothesis"),
+            weakest.c.confidence.label("weakest_confidence")
+        ).outerjoin(
+            obs_counts, obs_counts.c.category_id == PatternCategory.id
+        ).outerjoin(
+            primary, and_(primary.c.category_id == PatternCategory.id, primary.c.primary_rank == 1)
+        ).outerjoin(
+            weakest, and_(weakest.c.category_id == PatternCategory.id, weakest.c.weakest_rank == 1)
+        ).filter(
+            PatternCategory.user_id == self.user_id,
+            *criteria
+        ).order_by(PatternCategory.id).all()
+
     def pick_next_category(self) -> Optional[Dict]:
         """
         Pick next category to explore based on:
@@ -23,78 +87,65 @@ class ExplorationService:
         
         Returns category info ready for exploration.
         """
+        summaries = self._category_summaries()
         
         # First priority: Categories explicitly flagged for exploration
-        flagged = self.db.query(PatternHypothesis).join(PatternCategory).filter(
-            PatternHypothesis.user_id == self.user_id,
-            PatternHypothesis.needs_exploration == True
-        ).first()
-        
-        if flagged:
-            category = self.db.query(PatternCategory).get(flagged.category_id)
-            return self._format_for_exploration(category, flagged)
+        for summary in summaries:
+            if summary.needs_exploration:
+                return self._format_for_exploration(
+                    summary, summary.hypothesis, summary.confidence, summary.needs_exploration
+                )
         
         # Second priority: Categories with low observations (<3)
-        categories = self.db.query(PatternCategory).filter(
-            PatternCategory.user_id == self.user_id
-        ).all()
-        
-        for category in categories:
-            obs_count = self.db.query(func.count(PatternObservation.id)).filter(
-                PatternObservation.category_id == category.id
-            ).scalar()
-            
-            if obs_count < 3:
-                return self._format_for_exploration(category, None)
+        for summary in summaries:
+            if summary.observations < 3:
+                return self._format_for_exploration(summary)
         
         # Third priority: Low confidence categories
-        low_confidence = self.db.query(PatternHypothesis).join(PatternCategory).filter(
-            PatternHypothesis.user_id == self.user_id,
-            PatternHypothesis.confidence < 50
-        ).order_by(PatternHypothesis.confidence.asc()).first()
-        
+        low_confidence = [
+            s for s in summaries
+            if s.weakest_confidence is not None and s.weakest_confidence < 50
+        ]
         if low_confidence:
-            category = self.db.query(PatternCategory).get(low_confidence.category_id)
-            return self._format_for_exploration(category, low_confidence)
+            summary = min(low_confidence, key=lambda s: s.weakest_confidence)
+            return self._format_for_exploration(
+                summary, summary.weakest_hypothesis, summary.weakest_confidence
+            )
         
         return None
     
     def get_category_by_name(self, category_name: str) -> Optional[Dict]:
         """Get specific category for exploration."""
         
-        category = self.db.query(PatternCategory).filter(
-            PatternCategory.user_id == self.user_id,
+        summaries = self._category_summaries(
             PatternCategory.category_name.ilike(f"%{category_name}%")
-        ).first()
+        )
         
-        if not category:
+        if not summaries:
             return None
         
-        hypothesis = self.db.query(PatternHypothesis).filter(
-            PatternHypothesis.category_id == category.id
-        ).first()
-        
-        return self._format_for_exploration(category, hypothesis)
+        summary = summaries[0]
+        return self._format_for_exploration(
+            summary, summary.hypothesis, summary.confidence, summary.needs_exploration
+        )
     
     def _format_for_exploration(
         self,
-        category: PatternCategory,
-        hypothesis: Optional[PatternHypothesis]
+        summary,
+        hypothesis: Optional[str] = None,
+        confidence: Optional[int] = None,
+        needs_exploration: Optional[bool] = None
     ) -> Dict:
-        """Format category info for exploration prompt."""
-        
-        obs_count = self.db.query(func.count(PatternObservation.id)).filter(
-            PatternObservation.category_id == category.id
-        ).scalar()
+        """Format a category summary (plus chosen hypothesis) for the exploration prompt."""
         
         return {
-            'category_id': category.id,
-            'category_name': category.category_name,
-            'description': category.description,
-            'observations': obs_count,
-            'hypothesis': hypothesis.hypothesis if hypothesis else None,
-            'confidence': hypothesis.confidence if hypothesis else 0,
-            'needs_exploration': hypothesis.needs_exploration if hypothesis else False
+            'category_id': summary.category_id,
+            'category_name': summary.category_name,
+            'description': summary.description,
+            'observations': summary.observations,
+            'hypothesis': hypothesis,
+            'confidence': confidence or 0,
+            'needs_exploration': bool(needs_exploration)
         }
     
     def get_exploration_guidance(self, category_name: str) -> str:
@@ -241,12 +292,14 @@ class ExplorationService:
         category = self.db.query(PatternCategory).get(category_id)
         
         # Add each insight as an observation
-        for insight in insights:
-            learner.add_observation(
-                category_name=category.category_name,
-                observation=insight,
-                context={'source': 'exploration_session'}
-            )
+        learner.add_observations([
+            {
+                'category_name': category.category_name,
+                'observation': insight,
+                'context': {'source': 'exploration_session'}
+            }
+            for insight in insights
+        ])
         
         # Update hypothesis confidence
         hypothesis = self.db.query(PatternHypothesis).filter(
@@ -266,27 +319,14 @@ class ExplorationService:
     def get_all_categories_status(self) -> List[Dict]:
         """Get status of all pattern categories."""
         
-        categories = self.db.query(PatternCategory).filter(
-            PatternCategory.user_id == self.user_id
-        ).all()
-        
-        results = []
-        for cat in categories:
-            obs_count = self.db.query(func.count(PatternObservation.id)).filter(
-                PatternObservation.category_id == cat.id
-            ).scalar()
-            
-            hyp = self.db.query(PatternHypothesis).filter(
-                PatternHypothesis.category_id == cat.id
-            ).first()
-            
-            results.append({
-                'category': cat.category_name,
-                'description': cat.description,
-                'observations': obs_count,
-                'confidence': hyp.confidence if hyp else 0,
-                'hypothesis': hyp.hypothesis if hyp else None,
-                'needs_exploration': hyp.needs_exploration if hyp else False
-            })
-        
-        return results
+        return [
+            {
+                'category': summary.category_name,
+                'description': summary.description,
+                'observations': summary.observations,
+                'confidence': summary.confidence or 0,
+                'hypothesis': summary.hypothesis,
+                'needs_exploration': bool(summary.needs_exploration)
+            }
+            for summary in self._category_summaries()
+        ]
@@ -12,9 +12,9 @@ This is stored as observations and Sandy uses them in future responses.
 
 from typing import Dict, List
 from sqlalchemy.orm import Session
-import re
 
 from app.services.pattern_learning import PatternLearningService
+from app.services.signals import extract_signals
 
 
 def detect_feedback(user_message: str) -> Dict:
@@ -30,37 +30,16 @@ def detect_feedback(user_message: str) -> Dict:
     }
     """
     
-    msg_lower = user_message.lower()
-    
-    # Check for explicit feedback triggers
-    feedback_triggers = [
-        'sandy, ',
-        'hey sandy,',
-        'remember ',
-        'don\'t forget',
-        'please remember',
-        'from now on',
-        'stop ',
-        'don\'t ',
-        'i prefer',
-        'i like when',
-        'i don\'t like when',
-        'be more',
-        'be less',
-        'you should',
-        'can you be'
-    ]
-    
-    is_feedback = any(trigger in msg_lower for trigger in feedback_triggers)
-    
-    if not is_feedback:
+    signals = extract_signals(user_message)
+    
+    # Check for explicit feedback triggers (SIGNAL_PHRASES['feedback_trigger'])
+    if not signals.has('feedback_trigger'):
         return {'is_feedback': False}
     
     # Detect feedback type
     
     # TONE feedback
-    tone_keywords = ['formal', 'casual', 'friendly', 'professional', 'playful', 'serious', 'tone']
-    if any(word in msg_lower for word in tone_keywords):
+    if signals.has('tone'):
         return {
             'is_feedback': True,
             'feedback_type': 'tone',
@@ -69,8 +48,7 @@ def detect_feedback(user_message: str) -> Dict:
         }
     
     # QUESTION frequency feedback
-    question_keywords = ['questions', 'asking', 'stop asking', 'don\'t ask']
-    if any(word in msg_lower for word in question_keywords):
+    if signals.has('questions'):
         return {
             'is_feedback': True,
             'feedback_type': 'style',
@@ -79,8 +57,7 @@ def detect_feedback(user_message: str) -> Dict:
         }
     
     # DIRECTNESS feedback
-    directness_keywords = ['direct', 'blunt', 'straight', 'to the point']
-    if any(word in msg_lower for word in directness_keywords):
+    if signals.has('directness'):
         return {
             'is_feedback': True,
             'feedback_type': 'style',
@@ -89,10 +66,10 @@ def detect_feedback(user_message: str) -> Dict:
         }
     
     # PATTERN observations (remember/don't forget)
-    if 'remember' in msg_lower or 'don\'t forget' in msg_lower:
+    if signals.has('remember'):
         
         # Work patterns
-        if any(word in msg_lower for word in ['morning', 'afternoon', 'evening', 'night', 'time']):
+        if signals.has('time_of_day'):
             return {
                 'is_feedback': True,
                 'feedback_type': 'pattern',
@@ -101,7 +78,7 @@ def detect_feedback(user_message: str) -> Dict:
             }
         
         # Task preferences
-        if any(word in msg_lower for word in ['task', 'work', 'project']):
+        if signals.has('work_topic'):
             return {
                 'is_feedback': True,
                 'feedback_type': 'pattern',
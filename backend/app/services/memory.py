@@ -1,56 +1,97 @@
 """
-Long-term memory service using Pinecone vector database.
+Long-term memory service using a vector index (Pinecone or local).
 Stores and retrieves conversation embeddings for RAG.
 """
+import asyncio
+import logging
+import threading
 import time
-from typing import List, Dict
-from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
+from typing import List, Dict, Optional
+from openai import OpenAI, AsyncOpenAI
 
 from app.config import get_settings
+from app.services.embedding_cache import get_embedding_cache
+from app.services.vector_store import create_vector_store
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
 
 
 class MemoryService:
     def __init__(self):
         settings = get_settings()
         
-        # Initialize Pinecone
-        self.pc = Pinecone(api_key=settings.pinecone_api_key)
+        # Vector index (Pinecone or local, per settings.vector_backend)
         self.index_name = "adhd-coach-memory"
+        self.index = create_vector_store(
+            settings,
+            self.index_name,
+            dimension=1536  # OpenAI embedding size
+        )
         
         # Initialize OpenAI for embeddings
         self.openai_client = OpenAI(api_key=settings.openai_api_key)
+        self.async_openai_client = AsyncOpenAI(api_key=settings.openai_api_key)
         
-        # Create index if it doesn't exist
-        self._ensure_index_exists()
-        
-        # Connect to index
-        self.index = self.pc.Index(self.index_name)
-    
-    def _ensure_index_exists(self):
-        """Create Pinecone index if it doesn't exist"""
-        existing_indexes = [idx.name for idx in self.pc.list_indexes()]
-        
-        if self.index_name not in existing_indexes:
-            self.pc.create_index(
-                name=self.index_name,
-                dimension=1536,  # OpenAI embedding size
-                metric='cosine',
-                spec=ServerlessSpec(
-                    cloud='aws',
-                    region='us-east-1'
-                )
-            )
-            # Wait for index to be ready
-            time.sleep(10)
+        # Embeddings are content-addressed; identical text is never re-embedded
+        self.embedding_cache = get_embedding_cache()
     
     def create_embedding(self, text: str) -> List[float]:
-        """Create embedding vector from text using OpenAI"""
+        """Create embedding vector from text using OpenAI (cached)"""
+        return self.create_embeddings([text])[0]
+    
+    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Create embeddings for many texts; uncached ones go in a single OpenAI request"""
+        return self.embedding_cache.get_or_create(EMBEDDING_MODEL, texts, self._embed)
+    
+    async def acreate_embedding(self, text: str) -> List[float]:
+        """Async version of create_embedding for use inside bot handlers"""
+        embeddings = await self.embedding_cache.aget_or_create(EMBEDDING_MODEL, [text], self._aembed)
+        return embeddings[0]
+    
+    def warm_embeddings(self, texts: List[str]) -> int:
+        """Pre-populate the embedding cache; returns how many texts were embedded"""
+        return self.embedding_cache.warm(EMBEDDING_MODEL, texts, self._embed)
+    
+    def _embed(self, texts: List[str]) -> List[List[float]]:
         response = self.openai_client.embeddings.create(
-            input=text,
-            model="text-embedding-3-small"
+            input=texts,
+            model=EMBEDDING_MODEL
+        )
+        # Results carry their input position; don't rely on response order
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+    
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        response = await self.async_openai_client.embeddings.create(
+            input=texts,
+            model=EMBEDDING_MODEL
         )
-        return response.data[0].embedding
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+    
+    def _conversation_vector(
+        self,
+        conversation_id: int,
+        user_id: int,
+        user_message: str,
+        ai_response: str,
+        embedding: List[float],
+        session_id: str = None
+    ) -> Dict:
+        """Build the Pinecone vector record for a conversation"""
+        full_text = f"User: {user_message}\nAssistant: {ai_response}"
+        return {
+            "id": f"conv_{conversation_id}",
+            "values": embedding,
+            "metadata": {
+                "user_id": user_id,
+                "session_id": session_id or "",
+                "user_message": user_message[:500],  # Truncate for storage
+                "ai_response": ai_response[:500],
+                "full_text": full_text[:1000],
+                "timestamp": int(time.time())
+            }
+        }
     
     def store_conversation(
         self,
@@ -69,19 +110,27 @@ class MemoryService:
         
         # Store in Pinecone with metadata
         self.index.upsert(
-            vectors=[{
-                "id": f"conv_{conversation_id}",
-                "values": embedding,
-                "metadata": {
-                    "user_id": user_id,
-                    "session_id": session_id or "",
-                    "user_message": user_message[:500],  # Truncate for storage
-                    "ai_response": ai_response[:500],
-                    "full_text": full_text[:1000],
-                    "timestamp": int(time.time())
-                }
-            }]
+            vectors=[self._conversation_vector(
+                conversation_id, user_id, user_message, ai_response, embedding, session_id
+            )]
+        )
+    
+    async def astore_conversation(
+        self,
+        conversation_id: int,
+        user_id: int,
+        user_message: str,
+        ai_response: str,
+        session_id: str = None
+    ):
+        """Async version of store_conversation (Pinecone call runs in a worker thread)"""
+        full_text = f"User: {user_message}\nAssistant: {ai_response}"
+        embedding = await self.acreate_embedding(full_text)
+        
+        vector = self._conversation_vector(
+            conversation_id, user_id, user_message, ai_response, embedding, session_id
         )
+        await asyncio.to_thread(self.index.upsert, vectors=[vector])
     
     def search_relevant_memories(
         self,
@@ -106,18 +155,47 @@ class MemoryService:
         query_embedding = self.create_embedding(query)
         
         # Search Pinecone (includes both conversations and documents)
-        results = self.index.query(
-            vector=query_embedding,
-            filter={
+        results = self.index.query(**self._query_args(query_embedding, user_id, top_k, exclude_session))
+        
+        return self._format_matches(results)
+    
+    async def asearch_relevant_memories(
+        self,
+        query: str,
+        user_id: int,
+        top_k: int = 5,
+        exclude_session: str = None
+    ) -> List[Dict]:
+        """Async version of search_relevant_memories (Pinecone call runs in a worker thread)"""
+        query_embedding = await self.acreate_embedding(query)
+        
+        results = await asyncio.to_thread(
+            self.index.query, **self._query_args(query_embedding, user_id, top_k, exclude_session)
+        )
+        
+        return self._format_matches(results)
+    
+    def _query_args(
+        self,
+        query_embedding: List[float],
+        user_id: int,
+        top_k: int,
+        exclude_session: str = None
+    ) -> Dict:
+        """Build Pinecone query kwargs filtered to this user"""
+        return {
+            "vector": query_embedding,
+            "filter": {
                 "user_id": user_id,
                 # Exclude current session if provided
                 **({"session_id": {"$ne": exclude_session}} if exclude_session else {})
             },
-            top_k=top_k,
-            include_metadata=True
-        )
-        
-        # Format results
+            "top_k": top_k,
+            "include_metadata": True
+        }
+    
+    def _format_matches(self, results) -> List[Dict]:
+        """Turn Pinecone matches into memory dicts (conversations and document chunks)"""
         memories = []
         for match in results.matches:
             if match.score > 0.7:  # Only include relevant matches
@@ -147,10 +225,48 @@ class MemoryService:
 
 # Singleton instance
 _memory_service = None
+_memory_service_lock = threading.Lock()
+_memory_service_status = "cold"  # cold -> warming -> ready (or error, retried)
+
 
 def get_memory_service() -> MemoryService:
-    """Get or create the memory service singleton"""
+    """Get or create the memory service singleton (blocks while it is built)"""
     global _memory_service
     if _memory_service is None:
-        _memory_service = MemoryService()
+        with _memory_service_lock:
+            if _memory_service is None:
+                _memory_service = MemoryService()
+    return _memory_service
+
+
+def get_memory_service_if_ready() -> Optional[MemoryService]:
+    """The memory service if it has finished initializing, else None (never blocks)"""
     return _memory_service
+
+
+def memory_service_ready() -> bool:
+    return _memory_service is not None
+
+
+def memory_service_status() -> str:
+    """'cold', 'warming', 'ready' or 'error' (error is retried by the warmup task)"""
+    return "ready" if _memory_service is not None else _memory_service_status
+
+
+async def warm_memory_service(retry_delay: float = 30.0):
+    """
+    Build the memory service in a worker thread at bot startup.
+    
+    Index checks/creation can take seconds; doing it here keeps that off
+    the first user's message. Retries until it succeeds.
+    """
+    global _memory_service_status
+    while _memory_service is None:
+        _memory_service_status = "warming"
+        try:
+            await asyncio.to_thread(get_memory_service)
+            logger.info("Memory service ready")
+        except Exception as e:
+            _memory_service_status = "error"
+            logger.warning(f"Memory service warmup failed, retrying in {retry_delay:.0f}s: {e}")
+            await asyncio.sleep(retry_delay)
@@ -1,10 +1,49 @@
 """Pattern learning service - the intelligence system."""
+from collections import Counter
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from app.models.pattern_tracking import PatternCategory, PatternObservation, PatternHypothesis
+from app.models.pattern_tracking import (
+    PatternCategory,
+    PatternObservation,
+    PatternHypothesis,
+    PatternSubpatternStats
+)
+from app.services import data_versions
+
+# Counter key for observations without a specific sub-pattern
+GENERAL_SUB_PATTERN = 'general'
+
+
+class HypothesisSummary:
+    """A hypothesis joined with its category, as returned by the read helpers."""
+    __slots__ = (
+        "category",
+        "description",
+        "sub_pattern",
+        "hypothesis",
+        "confidence",
+        "supporting_observations"
+    )
+
+    def __init__(
+        self,
+        category: str,
+        description: Optional[str],
+        sub_pattern: Optional[str],
+        hypothesis: str,
+        confidence: int,
+        supporting_observations: int
+    ):
+        self.category = category
+        self.description = description
+        self.sub_pattern = sub_pattern
+        self.hypothesis = hypothesis
+        self.confidence = confidence
+        self.supporting_observations = supporting_observations
 
 
 class PatternLearningService:
@@ -31,179 +70,229 @@ class PatternLearningService:
     ):
         """Add a single observation to a category with optional subpattern."""
         
-        # Get or create category
-        category = self.db.query(PatternCategory).filter(
+        self.add_observations([{
+            'category_name': category_name,
+            'observation': observation,
+            'context': context,
+            'sub_pattern': sub_pattern
+        }])
+    
+    def add_observations(self, observations: List[Dict]) -> int:
+        """
+        Save every observation from one interaction in a single transaction.
+        
+        Each item takes add_observation's arguments (category_name,
+        observation, optional context and sub_pattern). Costs a constant
+        number of round trips however many observations there are: category
+        lookup, one bulk insert, one counter upsert, one hypothesis lookup,
+        one commit. Observations for unknown categories are skipped.
+        
+        Returns the number of observations saved.
+        """
+        
+        if not observations:
+            return 0
+        
+        categories = dict(self.db.query(
+            PatternCategory.category_name, PatternCategory.id
+        ).filter(
             PatternCategory.user_id == self.user_id,
-            PatternCategory.category_name == category_name
-        ).first()
+            PatternCategory.category_name.in_({o['category_name'] for o in observations})
+        ).all())
         
-        if not category:
-            return  # Category doesn't exist
+        rows = [
+            {
+                'user_id': self.user_id,
+                'category_id': categories[o['category_name']],
+                'sub_pattern': o.get('sub_pattern'),  # ← Now saves specific subpattern!
+                'observation': o['observation'],
+                'context': o.get('context') or {}
+            }
+            for o in observations
+            if o['category_name'] in categories  # Category doesn't exist
+        ]
+        if not rows:
+            return 0
         
-        # Add observation with subpattern
-        obs = PatternObservation(
-            user_id=self.user_id,
-            category_id=category.id,
-            sub_pattern=sub_pattern,  # ← Now saves specific subpattern!
-            observation=observation,
-            context=context or {}
+        self.db.execute(insert(PatternObservation), rows)
+        # Bulk inserts skip mapper events
+        data_versions.mark_changed(self.db, self.user_id, "patterns")
+        
+        # Bump the running counters and update only the affected hypotheses -
+        # independent of how much history the categories have
+        increments = Counter(
+            (row['category_id'], row['sub_pattern'] or GENERAL_SUB_PATTERN) for row in rows
         )
-        self.db.add(obs)
+        counts = self._count_observations(increments)
+        names = {category_id: name for name, category_id in categories.items()}
+        self._apply_hypotheses(counts, names)
         self.db.commit()
         
-        # Check if we should form/update hypothesis
-        self._update_hypotheses_for_category(category.id)
+        return len(rows)
+    
+    def _count_observations(self, increments: Dict[Tuple[int, str], int]) -> Dict[Tuple[int, str], int]:
+        """Add to the (category, sub_pattern) counters; returns the new totals."""
+        stmt = pg_insert(PatternSubpatternStats).values([
+            {
+                'user_id': self.user_id,
+                'category_id': category_id,
+                'sub_pattern': sp_key,
+                'observation_count': increment
+            }
+            for (category_id, sp_key), increment in increments.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_pattern_subpattern_stats_category_sub_pattern",
+            set_={
+                "observation_count": PatternSubpatternStats.observation_count + stmt.excluded.observation_count,
+                "last_observed_at": func.now()
+            }
+        ).returning(
+            PatternSubpatternStats.category_id,
+            PatternSubpatternStats.sub_pattern,
+            PatternSubpatternStats.observation_count
+        )
+        return {
+            (category_id, sp_key): count
+            for category_id, sp_key, count in self.db.execute(stmt)
+        }
+    
+    def _apply_hypotheses(self, counts: Dict[Tuple[int, str], int], category_names: Dict[int, str]):
+        """Form or update the hypothesis for each (category, sub_pattern) from its count."""
+        
+        detected = {}
+        for (category_id, sp_key), count in counts.items():
+            pattern_detected = self._detect_pattern(category_names[category_id], sp_key, count)
+            if pattern_detected:  # Otherwise not enough data yet
+                detected[(category_id, sp_key)] = pattern_detected
+        
+        if not detected:
+            return
+        
+        # Find existing hypotheses for these subpatterns in one query
+        existing = {
+            (h.category_id, h.sub_pattern or GENERAL_SUB_PATTERN): h
+            for h in self.db.query(PatternHypothesis).filter(
+                PatternHypothesis.category_id.in_({category_id for category_id, _ in detected})
+            )
+        }
+        
+        for (category_id, sp_key), pattern_detected in detected.items():
+            hypothesis = existing.get((category_id, sp_key))
+            
+            if not hypothesis:
+                hypothesis = PatternHypothesis(
+                    user_id=self.user_id,
+                    category_id=category_id,
+                    sub_pattern=None if sp_key == GENERAL_SUB_PATTERN else sp_key,
+                    hypothesis=pattern_detected['hypothesis'],
+                    confidence=pattern_detected['confidence'],
+                    supporting_observations=pattern_detected['supporting'],
+                    contradicting_observations=pattern_detected['contradicting'],
+                    status='exploring'
+                )
+                self.db.add(hypothesis)
+            else:
+                hypothesis.hypothesis = pattern_detected['hypothesis']
+                hypothesis.confidence = pattern_detected['confidence']
+                hypothesis.supporting_observations = pattern_detected['supporting']
+                hypothesis.contradicting_observations = pattern_detected['contradicting']
+                hypothesis.last_updated = datetime.utcnow()
+            
+            # Flag for exploration if confidence is low
+            if counts[(category_id, sp_key)] >= 10 and hypothesis.confidence < 30:
+                hypothesis.needs_exploration = True
+            
+            # Mark as confirmed if high confidence
+            if hypothesis.confidence >= 80:
+                hypothesis.status = 'confirmed'
     
     def _update_hypotheses_for_category(self, category_id: int):
         """
-        Analyze observations and update hypotheses.
+        Re-derive every subpattern hypothesis of a category from its counters.
         
-        NOW CONSIDERS SUBPATTERNS!
-        - Groups observations by subpattern
-        - Forms hypothesis per subpattern when ≥3 observations
-        - Also forms general category hypothesis
+        Not needed per observation (add_observations updates the affected
+        hypotheses); used after rebuilding the counters. Caller commits.
         """
         
-        # Get all observations for this category
-        observations = self.db.query(PatternObservation).filter(
-            PatternObservation.category_id == category_id
-        ).order_by(PatternObservation.observed_at.desc()).all()
-        
-        if len(observations) < 3:
-            return  # Not enough data yet
-        
-        # Group by subpattern
-        subpattern_groups = {}
-        for obs in observations:
-            sp = obs.sub_pattern or 'general'
-            if sp not in subpattern_groups:
-                subpattern_groups[sp] = []
-            subpattern_groups[sp].append(obs)
-        
-        # Form hypothesis for each subpattern with ≥3 observations
-        for sub_pattern, obs_list in subpattern_groups.items():
-            if len(obs_list) >= 3:
-                pattern_detected = self._detect_pattern(obs_list, sub_pattern)
-                
-                if pattern_detected:
-                    # Find or create hypothesis for this subpattern
-                    sp_value = None if sub_pattern == 'general' else sub_pattern
-                    hypothesis = self.db.query(PatternHypothesis).filter(
-                        PatternHypothesis.category_id == category_id,
-                        PatternHypothesis.sub_pattern == sp_value
-                    ).first()
-                    
-                    if not hypothesis:
-                        hypothesis = PatternHypothesis(
-                            user_id=self.user_id,
-                            category_id=category_id,
-                            sub_pattern=sp_value,
-                            hypothesis=pattern_detected['hypothesis'],
-                            confidence=pattern_detected['confidence'],
-                            supporting_observations=pattern_detected['supporting'],
-                            contradicting_observations=pattern_detected['contradicting'],
-                            status='exploring'
-                        )
-                        self.db.add(hypothesis)
-                    else:
-                        hypothesis.hypothesis = pattern_detected['hypothesis']
-                        hypothesis.confidence = pattern_detected['confidence']
-                        hypothesis.supporting_observations = pattern_detected['supporting']
-                        hypothesis.contradicting_observations = pattern_detected['contradicting']
-                        hypothesis.last_updated = datetime.utcnow()
-                    
-                    # Flag for exploration if confidence is low
-                    if len(obs_list) >= 10 and hypothesis.confidence < 30:
-                        hypothesis.needs_exploration = True
-                    
-                    # Mark as confirmed if high confidence
-                    if hypothesis.confidence >= 80:
-                        hypothesis.status = 'confirmed'
-        
-        self.db.commit()
+        category = self.db.query(PatternCategory).get(category_id)
+        counts = dict(
+            ((category_id, sp_key), count)
+            for sp_key, count in self.db.query(
+                PatternSubpatternStats.sub_pattern,
+                PatternSubpatternStats.observation_count
+            ).filter(PatternSubpatternStats.category_id == category_id)
+        )
+        self._apply_hypotheses(counts, {category_id: category.category_name})
     
-    def _detect_pattern(self, observations: List[PatternObservation], sub_pattern: str = None) -> Optional[Dict]:
+    def _detect_pattern(self, category_name: str, sub_pattern: str, count: int) -> Optional[Dict]:
         """
-        Analyze observations to detect patterns.
+        Form a hypothesis from the observation count of one subpattern.
         
         Enhanced with subpattern awareness!
         """
         
-        if len(observations) < 3:
+        if count < 3:
             return None
         
-        # Get category
-        category = self.db.query(PatternCategory).get(observations[0].category_id)
-        
         # Import subpattern descriptions
         from app.services.subpatterns import get_subpattern_description
         
         # Build hypothesis text
-        if sub_pattern and sub_pattern != 'general':
-            sp_desc = get_subpattern_description(category.category_name, sub_pattern)
+        if sub_pattern and sub_pattern != GENERAL_SUB_PATTERN:
+            sp_desc = get_subpattern_description(category_name, sub_pattern)
             if sp_desc:
-                hypothesis_text = f"{sp_desc} (observed {len(observations)} times)"
+                hypothesis_text = f"{sp_desc} (observed {count} times)"
             else:
-                hypothesis_text = f"Pattern: {sub_pattern} (observed {len(observations)} times)"
+                hypothesis_text = f"Pattern: {sub_pattern} (observed {count} times)"
         else:
             # General category hypothesis
-            hypothesis_text = f"Pattern emerging in {category.category_name.replace('_', ' ')} ({len(observations)} observations)"
+            hypothesis_text = f"Pattern emerging in {category_name.replace('_', ' ')} ({count} observations)"
         
         # Calculate confidence (simple for now)
         # Base: 10 per observation, max 100
-        # Adjusted by recency (more recent = higher confidence)
-        base_confidence = min(len(observations) * 10, 100)
+        base_confidence = min(count * 10, 100)
         
         return {
             'hypothesis': hypothesis_text,
             'confidence': base_confidence,
-            'supporting': len(observations),
+            'supporting': count,
             'contradicting': 0
         }
     
-    def get_categories_needing_exploration(self) -> List[Dict]:
+    def _hypothesis_summaries(self, *criteria, order_by=None) -> List["HypothesisSummary"]:
+        """Hypotheses with their category name/description, in one joined query."""
+        query = self.db.query(
+            PatternCategory.category_name,
+            PatternCategory.description,
+            PatternHypothesis.sub_pattern,
+            PatternHypothesis.hypothesis,
+            PatternHypothesis.confidence,
+            PatternHypothesis.supporting_observations
+        ).join(
+            PatternCategory, PatternCategory.id == PatternHypothesis.category_id
+        ).filter(
+            PatternHypothesis.user_id == self.user_id,
+            *criteria
+        )
+        if order_by is not None:
+            query = query.order_by(order_by)
+        return [HypothesisSummary(*row) for row in query.all()]
+    
+    def get_categories_needing_exploration(self) -> List["HypothesisSummary"]:
         """Get categories that need targeted exploration."""
         
         # Get hypotheses flagged for exploration
-        hypotheses = self.db.query(PatternHypothesis).join(PatternCategory).filter(
-            PatternHypothesis.user_id == self.user_id,
-            PatternHypothesis.needs_exploration == True
-        ).all()
-        
-        results = []
-        for hyp in hypotheses:
-            category = self.db.query(PatternCategory).get(hyp.category_id)
-            results.append({
-                'category': category.category_name,
-                'description': category.description,
-                'current_hypothesis': hyp.hypothesis,
-                'confidence': hyp.confidence,
-                'observations': hyp.supporting_observations
-            })
-        
-        return results
+        return self._hypothesis_summaries(PatternHypothesis.needs_exploration == True)
     
-    def get_confirmed_patterns(self, min_confidence: int = 80) -> List[Dict]:
+    def get_confirmed_patterns(self, min_confidence: int = 80) -> List["HypothesisSummary"]:
         """Get patterns Sandy is confident about (including subpatterns)."""
         
-        hypotheses = self.db.query(PatternHypothesis).join(PatternCategory).filter(
-            PatternHypothesis.user_id == self.user_id,
+        return self._hypothesis_summaries(
             PatternHypothesis.confidence >= min_confidence,
-            PatternHypothesis.status == 'confirmed'
-        ).order_by(PatternHypothesis.confidence.desc()).all()
-        
-        results = []
-        for hyp in hypotheses:
-            category = self.db.query(PatternCategory).get(hyp.category_id)
-            results.append({
-                'category': category.category_name,
-                'sub_pattern': hyp.sub_pattern,  # NEW: Include subpattern
-                'hypothesis': hyp.hypothesis,
-                'confidence': hyp.confidence,
-                'supporting_observations': hyp.supporting_observations
-            })
-        
-        return results
+            PatternHypothesis.status == 'confirmed',
+            order_by=PatternHypothesis.confidence.desc()
+        )
     
     def create_new_category(self, category_name: str, description: str):
         """Create a new user-discovered category."""
@@ -246,3 +335,45 @@ class PatternLearningService:
             'needs_exploration': hypothesis.needs_exploration if hypothesis else False,
             'status': hypothesis.status if hypothesis else 'no_data'
         }
+
+
+def rebuild_pattern_stats(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Recompute the (category, sub_pattern) counters from the full observation
+    history and re-derive the hypotheses from them.
+
+    Returns the number of counter rows written.
+    """
+    sp_key = func.coalesce(PatternObservation.sub_pattern, GENERAL_SUB_PATTERN)
+
+    stale = db.query(PatternSubpatternStats)
+    history = select(
+        PatternObservation.user_id,
+        PatternObservation.category_id,
+        sp_key,
+        func.count(PatternObservation.id),
+        func.min(PatternObservation.observed_at),
+        func.max(PatternObservation.observed_at)
+    ).group_by(PatternObservation.user_id, PatternObservation.category_id, sp_key)
+
+    if user_id is not None:
+        stale = stale.filter(PatternSubpatternStats.user_id == user_id)
+        history = history.where(PatternObservation.user_id == user_id)
+
+    stale.delete(synchronize_session=False)
+    written = db.execute(
+        pg_insert(PatternSubpatternStats).from_select(
+            ["user_id", "category_id", "sub_pattern", "observation_count", "first_observed_at", "last_observed_at"],
+            history
+        )
+    ).rowcount
+
+    categories = db.query(PatternSubpatternStats.user_id, PatternSubpatternStats.category_id).distinct()
+    if user_id is not None:
+        categories = categories.filter(PatternSubpatternStats.user_id == user_id)
+
+    for owner_id, category_id in categories.all():
+        PatternLearningService(owner_id, db)._update_hypotheses_for_category(category_id)
+
+    db.commit()
+    return written
@@ -1,13 +1,170 @@
 """Pattern Recognition - track behavior patterns, procrastination, context switching."""
+import functools
+import inspect
+import string
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List
-from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict, defaultdict
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 
 from app.models.conversation import Conversation
+from app.models.intention import IntentionMention
 from app.models.task import Task, TaskStatus
-from app.models.project import Project
+from app.models.rollup import UserDailyRollup
+from app.services import data_versions
+from app.services.signals import extract_signals
+
+
+def normalize_activity(activity: str) -> str:
+    """Key for grouping mentions: lowercase words without surrounding punctuation."""
+    words = (word.strip(string.punctuation) for word in activity.lower().split())
+    return " ".join(word for word in words if word)[:200]
+
+
+def record_intentions(db: Session, conversation: Conversation) -> int:
+    """
+    Add an IntentionMention for each intention in the conversation's user
+    message (conversation must be flushed). The caller commits.
+    """
+    mentions = []
+    for intention in extract_signals(conversation.user_message).intentions:
+        activity = normalize_activity(intention.activity)
+        if activity:
+            mentions.append(IntentionMention(
+                user_id=conversation.user_id,
+                conversation_id=conversation.id,
+                activity=activity,
+                phrase=intention.phrase,
+                mentioned_at=conversation.created_at
+            ))
+    db.add_all(mentions)
+    return len(mentions)
+
+
+def rebuild_intentions(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Re-extract the intention index from the full conversation history.
+
+    Returns the number of mentions written.
+    """
+    stale = db.query(IntentionMention)
+    conversations = db.query(Conversation).order_by(Conversation.id)
+    if user_id is not None:
+        stale = stale.filter(IntentionMention.user_id == user_id)
+        conversations = conversations.filter(Conversation.user_id == user_id)
+
+    stale.delete(synchronize_session=False)
+    written = 0
+    for conversation in conversations.yield_per(500):
+        written += record_intentions(db, conversation)
+
+    db.commit()
+    return written
+
+
+class _Analysis:
+    __slots__ = ("versions", "built_at", "result")
+
+    def __init__(self, versions: Tuple[int, ...], built_at: float, result: Any):
+        self.versions = versions
+        self.built_at = built_at
+        self.result = result
+
+
+class PatternAnalysisCache:
+    """
+    LRU of PatternRecognizer results shared across requests. Each entry
+    remembers the data_versions it was computed from and is recomputed once
+    they move, or after the TTL (the analyses use "last N days" windows).
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 5000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, _Analysis]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, key: tuple, sources: Tuple[str, ...], compute: Callable[[], Any]) -> Any:
+        # Read versions before computing: a write that commits mid-compute
+        # leaves this entry behind the counters, so the next call recomputes.
+        current = data_versions.versions(user_id, sources)
+        now = time.monotonic()
+        cache_key = (user_id,) + key
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry.versions == current and now - entry.built_at <= self.ttl_seconds:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry.result
+            self.misses += 1
+
+        result = compute()
+
+        with self._lock:
+            self._entries[cache_key] = _Analysis(current, now, result)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Drop one user's results (or everyone's)."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                for cache_key in [k for k in self._entries if k[0] == user_id]:
+                    del self._entries[cache_key]
+
+
+# Singleton instance
+_analysis_cache: Optional[PatternAnalysisCache] = None
+
+
+def get_pattern_analysis_cache() -> PatternAnalysisCache:
+    """Get or create the pattern analysis cache singleton"""
+    global _analysis_cache
+    if _analysis_cache is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _analysis_cache = PatternAnalysisCache(
+            ttl_seconds=settings.pattern_analysis_cache_ttl_seconds,
+            max_entries=settings.pattern_analysis_cache_max_entries
+        )
+    return _analysis_cache
+
+
+def _memoized(*sources: str):
+    """
+    Cache a PatternRecognizer analysis on the instance (one request) and in
+    the shared PatternAnalysisCache, keyed by its arguments with defaults
+    applied. ``sources`` are the data_versions it reads. Results are shared -
+    don't mutate them.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = (method.__name__,) + tuple(bound.arguments.values())[1:]
+
+            if key not in self._memo:
+                self._memo[key] = get_pattern_analysis_cache().get(
+                    self.user_id, key, sources, lambda: method(self, *args, **kwargs)
+                )
+            return self._memo[key]
+
+        return wrapper
+    return decorator
 
 
 class PatternRecognizer:
@@ -16,7 +173,9 @@ class PatternRecognizer:
     def __init__(self, user_id: int, db: Session):
         self.user_id = user_id
         self.db = db
+        self._memo: Dict[tuple, Any] = {}  # this request's results, see _memoized
     
+    @_memoized("conversations")
     def detect_repeated_intentions(self, days: int = 7) -> List[Dict]:
         """
         Detect when user mentions the same task/intention multiple times.
@@ -25,66 +184,61 @@ class PatternRecognizer:
         - "I'll do X later" patterns
         - Repeated mentions without action
         - Tasks created but never started
+        
+        Reads the intention_mentions index (filled by record_intentions when
+        each conversation is saved) - no message text is rescanned.
         """
         since_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Get recent conversations
-        conversations = self.db.query(Conversation).filter(
-            and_(
-                Conversation.user_id == self.user_id,
-                Conversation.created_at >= since_date
-            )
-        ).order_by(Conversation.created_at.desc()).all()
-        
-        # Keywords that indicate procrastination
-        procrastination_phrases = [
-            "later",
-            "tomorrow",
-            "soon",
-            "need to",
-            "should",
-            "gonna",
-            "going to",
-            "will do"
+        recent = and_(
+            IntentionMention.user_id == self.user_id,
+            IntentionMention.mentioned_at >= since_date
+        )
+        
+        # Activities mentioned 3+ times
+        repeated = self.db.query(
+            IntentionMention.activity,
+            func.count(IntentionMention.id),
+            func.min(IntentionMention.mentioned_at),
+            func.max(IntentionMention.mentioned_at)
+        ).filter(recent).group_by(
+            IntentionMention.activity
+        ).having(
+            func.count(IntentionMention.id) >= 3
+        ).order_by(func.max(IntentionMention.mentioned_at).desc()).all()
+        
+        if not repeated:
+            return []
+        
+        # Most recent phrases for the repeated activities only
+        sample_phrases = defaultdict(list)
+        for activity, phrase in self.db.query(IntentionMention.activity, IntentionMention.phrase).filter(
+            recent,
+            IntentionMention.activity.in_([row[0] for row in repeated])
+        ).order_by(IntentionMention.mentioned_at.desc(), IntentionMention.id.desc()):
+            if len(sample_phrases[activity]) < 3:
+                sample_phrases[activity].append(phrase)
+        
+        return [
+            {
+                "activity": activity,
+                "mention_count": mention_count,
+                "first_mention": first_mention,
+                "last_mention": last_mention,
+                "days_repeating": (last_mention - first_mention).days,
+                "sample_phrases": sample_phrases[activity]
+            }
+            for activity, mention_count, first_mention, last_mention in repeated
         ]
-        
-        # Track mentions of activities
-        mentions = defaultdict(list)
-        
-        for conv in conversations:
-            message_lower = conv.user_message.lower()
-            
-            # Check for procrastination language
-            for phrase in procrastination_phrases:
-                if phrase in message_lower:
-                    # Extract the thing they're putting off
-                    # Simple extraction: words after the phrase
-                    words = message_lower.split()
-                    if phrase in words:
-                        idx = words.index(phrase)
-                        if idx + 1 < len(words):
-                            activity = " ".join(words[idx+1:idx+4])  # Next 3 words
-                            mentions[activity].append({
-                                "date": conv.created_at,
-                                "phrase": phrase,
-                                "full_message": conv.user_message[:100]
-                            })
-        
-        # Find repeated patterns (mentioned 3+ times)
-        patterns = []
-        for activity, mention_list in mentions.items():
-            if len(mention_list) >= 3:
-                patterns.append({
-                    "activity": activity,
-                    "mention_count": len(mention_list),
-                    "first_mention": mention_list[-1]["date"],
-                    "last_mention": mention_list[0]["date"],
-                    "days_repeating": (mention_list[0]["date"] - mention_list[-1]["date"]).days,
-                    "sample_phrases": [m["phrase"] for m in mention_list[:3]]
-                })
-        
-        return patterns
     
+    def _rollup_days(self, days: int):
+        """Filter for this user's rollups of the last ``days`` days (today included)."""
+        since_day = (datetime.utcnow() - timedelta(days=days)).date()
+        return and_(
+            UserDailyRollup.user_id == self.user_id,
+            UserDailyRollup.day >= since_day
+        )
+    
+    @_memoized("rollups", "tasks")
     def analyze_task_completion_rate(self, days: int = 30) -> Dict:
         """
         Analyze task completion patterns.
@@ -93,110 +247,88 @@ class PatternRecognizer:
         - Completion rate
         - Average time to complete
         - Tasks that get stuck
+        
+        Counts come from the daily rollups (tasks by creation day); stuck
+        tasks are read from tasks, so they show up before the first refresh.
+        Without rollup rows the rate is None (unknown), not 0.
         """
-        since_date = datetime.utcnow() - timedelta(days=days)
+        total, completed, in_progress, todo, done_seconds, done_timed = self.db.query(
+            func.coalesce(func.sum(UserDailyRollup.tasks_created), 0),
+            func.coalesce(func.sum(UserDailyRollup.tasks_done), 0),
+            func.coalesce(func.sum(UserDailyRollup.tasks_in_progress), 0),
+            func.coalesce(func.sum(UserDailyRollup.tasks_todo), 0),
+            func.coalesce(func.sum(UserDailyRollup.done_seconds_total), 0),
+            func.coalesce(func.sum(UserDailyRollup.done_timed), 0)
+        ).filter(self._rollup_days(days)).one()
         
-        # Get all tasks created in period
-        all_tasks = self.db.query(Task).filter(
-            and_(
+        # Identify stuck tasks (created > 7 days ago, still TODO)
+        now = datetime.utcnow()
+        stuck_threshold = now - timedelta(days=7)
+        stuck_tasks = [
+            {
+                "title": title,
+                "days_stuck": (now - created_at).days,
+                "priority": priority.value if priority else None
+            }
+            for title, created_at, priority in self.db.query(Task.title, Task.created_at, Task.priority).filter(
                 Task.user_id == self.user_id,
-                Task.created_at >= since_date
-            )
-        ).all()
+                Task.created_at >= now - timedelta(days=days),
+                Task.status == TaskStatus.TODO,
+                Task.created_at < stuck_threshold
+            ).order_by(Task.created_at)
+        ]
         
-        if not all_tasks:
+        if not total:
             return {
-                "completion_rate": 0,
-                "message": "No tasks in period"
+                "completion_rate": None,
+                "message": "No tasks in period",
+                "stuck_tasks": stuck_tasks
             }
         
-        completed = [t for t in all_tasks if t.status == TaskStatus.DONE]
-        in_progress = [t for t in all_tasks if t.status == TaskStatus.IN_PROGRESS]
-        todo = [t for t in all_tasks if t.status == TaskStatus.TODO]
-        
-        completion_rate = len(completed) / len(all_tasks) * 100
-        
-        # Calculate average time to completion
-        completion_times = []
-        for task in completed:
-            if task.completed_at:
-                time_to_complete = (task.completed_at - task.created_at).total_seconds() / 3600
-                completion_times.append(time_to_complete)
-        
-        avg_completion_time = sum(completion_times) / len(completion_times) if completion_times else 0
-        
-        # Identify stuck tasks (created > 7 days ago, still TODO)
-        stuck_threshold = datetime.utcnow() - timedelta(days=7)
-        stuck_tasks = [
-            t for t in todo
-            if t.created_at < stuck_threshold
-        ]
+        completion_rate = completed / total * 100
+        avg_completion_time = float(done_seconds) / done_timed / 3600 if done_timed else 0
         
         return {
             "completion_rate": round(completion_rate, 1),
-            "total_tasks": len(all_tasks),
-            "completed": len(completed),
-            "in_progress": len(in_progress),
-            "todo": len(todo),
+            "total_tasks": total,
+            "completed": completed,
+            "in_progress": in_progress,
+            "todo": todo,
             "avg_completion_hours": round(avg_completion_time, 1),
-            "stuck_tasks": [
-                {
-                    "title": t.title,
-                    "days_stuck": (datetime.utcnow() - t.created_at).days,
-                    "priority": t.priority.value
-                }
-                for t in stuck_tasks
-            ]
+            "stuck_tasks": stuck_tasks
         }
     
+    @_memoized("rollups")
     def detect_context_switching(self, days: int = 7) -> Dict:
         """
         Detect how often user switches between projects/topics.
         
         High context switching = ADHD red flag.
-        """
-        since_date = datetime.utcnow() - timedelta(days=days)
-        
-        conversations = self.db.query(Conversation).filter(
-            and_(
-                Conversation.user_id == self.user_id,
-                Conversation.created_at >= since_date
-            )
-        ).order_by(Conversation.created_at.asc()).all()
         
-        if len(conversations) < 5:
+        A switch is two consecutive messages mentioning different projects;
+        the rollups count them per day and keep each day's first and last
+        message's project for the switches across midnight.
+        """
+        rollups = self.db.query(
+            UserDailyRollup.messages,
+            UserDailyRollup.project_switches,
+            UserDailyRollup.first_project,
+            UserDailyRollup.last_project
+        ).filter(
+            self._rollup_days(days),
+            UserDailyRollup.messages > 0
+        ).order_by(UserDailyRollup.day).all()
+        
+        total_conversations = sum(row.messages for row in rollups)
+        if total_conversations < 5:
             return {"switches": 0, "message": "Not enough data"}
         
-        # Get active projects
-        projects = self.db.query(Project).filter(
-            Project.user_id == self.user_id
-        ).all()
-        
-        project_titles = [p.title.lower() for p in projects]
-        
-        # Track which project each conversation mentions
-        conversation_projects = []
-        for conv in conversations:
-            msg_lower = conv.user_message.lower()
-            mentioned_project = None
-            
-            for title in project_titles:
-                if title in msg_lower:
-                    mentioned_project = title
-                    break
-            
-            conversation_projects.append(mentioned_project)
-        
-        # Count switches (when project changes between consecutive messages)
-        switches = 0
-        for i in range(1, len(conversation_projects)):
-            prev = conversation_projects[i-1]
-            curr = conversation_projects[i]
-            
-            if prev and curr and prev != curr:
+        switches = sum(row.project_switches for row in rollups)
+        for prev, curr in zip(rollups, rollups[1:]):
+            if prev.last_project and curr.first_project and prev.last_project != curr.first_project:
                 switches += 1
         
-        switch_rate = switches / len(conversations) * 100 if conversations else 0
+        switch_rate = switches / total_conversations * 100
         
         # Classify
         if switch_rate > 40:
@@ -208,35 +340,32 @@ class PatternRecognizer:
         
         return {
             "switches": switches,
-            "total_conversations": len(conversations),
+            "total_conversations": total_conversations,
             "switch_rate": round(switch_rate, 1),
             "assessment": assessment
         }
     
+    @_memoized("rollups")
     def identify_productive_times(self) -> Dict:
         """
         Identify when user is most productive based on task completion times.
-        """
-        # Get completed tasks
-        completed = self.db.query(Task).filter(
-            and_(
-                Task.user_id == self.user_id,
-                Task.status == TaskStatus.DONE,
-                Task.completed_at.isnot(None)
-            )
-        ).all()
-        
-        if len(completed) < 10:
-            return {"message": "Not enough completed tasks to analyze"}
         
-        # Group by hour of day
+        Hours are in the user's timezone (bucketed when the rollups refresh).
+        """
         hour_counts = defaultdict(int)
-        for task in completed:
-            hour = task.completed_at.hour
-            hour_counts[hour] += 1
+        for (by_hour,) in self.db.query(UserDailyRollup.completions_by_hour).filter(
+            UserDailyRollup.user_id == self.user_id,
+            UserDailyRollup.tasks_completed > 0
+        ):
+            for hour, count in by_hour.items():
+                hour_counts[int(hour)] += count
+        
+        total_completions = sum(hour_counts.values())
+        if total_completions < 10:
+            return {"message": "Not enough completed tasks to analyze"}
         
         # Find peak hours
-        sorted_hours = sorted(hour_counts.items(), key=lambda x: x[1], reverse=True)
+        sorted_hours = sorted(hour_counts.items(), key=lambda x: (-x[1], x[0]))
         peak_hours = sorted_hours[:3]
         
         # Format hours
@@ -250,10 +379,34 @@ class PatternRecognizer:
         
         return {
             "peak_productive_times": peak_times,
-            "total_completions": len(completed),
+            "total_completions": total_completions,
             "recommendation": f"Schedule important work during {peak_times[0]['time']}"
         }
     
+    @_memoized("rollups")
+    def summarize_recent_activity(self, days: int = 7) -> Dict:
+        """Messages, completions, focus time and check-ins over the last few days."""
+        row = self.db.query(
+            func.coalesce(func.sum(UserDailyRollup.messages), 0).label("messages"),
+            func.coalesce(func.sum(UserDailyRollup.tasks_completed), 0).label("tasks_completed"),
+            func.coalesce(func.sum(UserDailyRollup.work_sessions), 0).label("work_sessions"),
+            func.coalesce(func.sum(UserDailyRollup.focus_minutes), 0).label("focus_minutes"),
+            func.coalesce(func.sum(UserDailyRollup.checkins), 0).label("checkins"),
+            func.coalesce(func.sum(UserDailyRollup.energy_total), 0).label("energy_total"),
+            func.coalesce(func.sum(UserDailyRollup.energy_ratings), 0).label("energy_ratings")
+        ).filter(self._rollup_days(days)).one()
+        
+        return {
+            "days": days,
+            "messages": row.messages,
+            "tasks_completed": row.tasks_completed,
+            "work_sessions": row.work_sessions,
+            "focus_minutes": row.focus_minutes,
+            "checkins": row.checkins,
+            "avg_energy": round(row.energy_total / row.energy_ratings, 1) if row.energy_ratings else None
+        }
+    
+    @_memoized("conversations", "tasks", "rollups")
     def generate_accountability_message(self) -> str:
         """
         Generate accountability message based on detected patterns.
@@ -281,10 +434,11 @@ class PatternRecognizer:
                     f"'{task['title']}' has been sitting for {task['days_stuck']} days."
                 )
         
-        # Low completion rate
-        if completion_stats.get("completion_rate", 100) < 30:
+        # Low completion rate (None = no rollups yet)
+        completion_rate = completion_stats.get("completion_rate")
+        if completion_rate is not None and completion_rate < 30:
             messages.append(
-                f"Your task completion rate is {completion_stats['completion_rate']}% this month."
+                f"Your task completion rate is {completion_rate}% this month."
             )
         
         return "\n".join(messages) if messages else ""
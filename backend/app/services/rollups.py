@@ -0,0 +1,341 @@
+"""
+Daily analytics rollups.
+
+Completion rates, productive hours and context switching used to be
+recomputed from the raw tables on every request. refresh_rollups summarizes
+tasks, conversations, work_sessions and checkins into one
+user_daily_rollups row per user and (UTC) day; PatternRecognizer and the AI
+context read those in O(days).
+
+Each source refreshes only its recent days: tasks over the last
+rollup_task_window_days (a task's status still changes after the day it was
+created, and no reader looks further back than that), the append-only
+sources over rollup_activity_window_days. Older days stay as they were.
+RollupScheduler runs the refresh periodically in the bot process, starting
+with a full one while the table is still empty; the full history is
+rebuilt with: python backfill.py rollups
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import Date, and_, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.checkin import Checkin
+from app.models.conversation import Conversation
+from app.models.project import Project
+from app.models.rollup import UserDailyRollup
+from app.models.task import Task, TaskStatus
+from app.models.user import User
+from app.models.work_session import WorkSession
+from app.services import data_versions
+
+logger = logging.getLogger(__name__)
+
+RollupRows = Dict[Tuple[int, date], dict]
+
+
+def _day(column):
+    return func.date(column, type_=Date)
+
+
+def _user_zones(db: Session, user_ids) -> Dict[int, ZoneInfo]:
+    zones = {}
+    for user_id, name in db.query(User.id, User.timezone).filter(User.id.in_(list(user_ids))):
+        try:
+            zones[user_id] = ZoneInfo(name)
+        except (TypeError, ValueError, ZoneInfoNotFoundError):
+            zones[user_id] = ZoneInfo("UTC")
+    return zones
+
+
+def _task_rows(db: Session, since: Optional[date], user_id: Optional[int]) -> RollupRows:
+    rows: RollupRows = defaultdict(dict)
+
+    # By creation day, current status
+    created_day = _day(Task.created_at)
+    done = Task.status == TaskStatus.DONE
+    timed = and_(done, Task.completed_at.isnot(None))
+    created = db.query(
+        Task.user_id,
+        created_day,
+        func.count(Task.id),
+        func.count(Task.id).filter(done),
+        func.count(Task.id).filter(Task.status == TaskStatus.IN_PROGRESS),
+        func.count(Task.id).filter(Task.status == TaskStatus.TODO),
+        func.sum(func.extract("epoch", Task.completed_at - Task.created_at)).filter(timed),
+        func.count(Task.id).filter(timed)
+    ).group_by(Task.user_id, created_day)
+    if since is not None:
+        created = created.filter(Task.created_at >= since)
+    if user_id is not None:
+        created = created.filter(Task.user_id == user_id)
+
+    for owner_id, day, total, n_done, n_in_progress, n_todo, done_seconds, n_timed in created:
+        rows[(owner_id, day)].update(
+            tasks_created=total,
+            tasks_done=n_done,
+            tasks_in_progress=n_in_progress,
+            tasks_todo=n_todo,
+            done_seconds_total=float(done_seconds or 0),
+            done_timed=n_timed
+        )
+
+    # By completion day, with the hour in the user's timezone
+    completions = db.query(Task.user_id, Task.completed_at).filter(timed)
+    if since is not None:
+        completions = completions.filter(Task.completed_at >= since)
+    if user_id is not None:
+        completions = completions.filter(Task.user_id == user_id)
+    completions = completions.all()
+
+    zones = _user_zones(db, {owner_id for owner_id, _ in completions})
+    for owner_id, completed_at in completions:
+        row = rows[(owner_id, completed_at.date())]
+        row["tasks_completed"] = row.get("tasks_completed", 0) + 1
+        hour = str(completed_at.replace(tzinfo=ZoneInfo("UTC")).astimezone(zones[owner_id]).hour)
+        by_hour = row.setdefault("completions_by_hour", {})
+        by_hour[hour] = by_hour.get(hour, 0) + 1
+
+    return rows
+
+
+def _conversation_rows(db: Session, since: Optional[date], user_id: Optional[int]) -> RollupRows:
+    conversations = db.query(
+        Conversation.user_id, Conversation.created_at, Conversation.user_message
+    ).order_by(Conversation.user_id, Conversation.created_at)
+    if since is not None:
+        conversations = conversations.filter(Conversation.created_at >= since)
+    if user_id is not None:
+        conversations = conversations.filter(Conversation.user_id == user_id)
+    conversations = conversations.all()
+
+    project_names = defaultdict(list)
+    owners = {owner_id for owner_id, _, _ in conversations}
+    if owners:
+        for owner_id, name in db.query(Project.user_id, Project.name).filter(
+            Project.user_id.in_(list(owners))
+        ).order_by(Project.id):
+            project_names[owner_id].append(name.lower())
+
+    rows: RollupRows = {}
+    previous_key = None
+    previous_project = None
+    for owner_id, created_at, user_message in conversations:
+        # First project name the message mentions (same rule as before)
+        msg_lower = user_message.lower()
+        mentioned_project = next((name for name in project_names[owner_id] if name in msg_lower), None)
+
+        key = (owner_id, created_at.date())
+        if key != previous_key:
+            rows[key] = dict(messages=0, project_switches=0, first_project=mentioned_project, last_project=None)
+            previous_project = None
+        row = rows[key]
+        if previous_project and mentioned_project and previous_project != mentioned_project:
+            row["project_switches"] += 1
+        row["messages"] += 1
+        row["last_project"] = mentioned_project
+        previous_key, previous_project = key, mentioned_project
+
+    for row in rows.values():
+        for field in ("first_project", "last_project"):
+            if row[field] is not None:
+                row[field] = row[field][:200]
+    return rows
+
+
+def _work_session_rows(db: Session, since: Optional[date], user_id: Optional[int]) -> RollupRows:
+    started_day = _day(WorkSession.started_at)
+    sessions = db.query(
+        WorkSession.user_id,
+        started_day,
+        func.count(WorkSession.id),
+        func.count(WorkSession.id).filter(WorkSession.completed.is_(True)),
+        func.coalesce(func.sum(WorkSession.duration_minutes), 0)
+    ).group_by(WorkSession.user_id, started_day)
+    if since is not None:
+        sessions = sessions.filter(WorkSession.started_at >= since)
+    if user_id is not None:
+        sessions = sessions.filter(WorkSession.user_id == user_id)
+
+    return {
+        (owner_id, day): dict(work_sessions=total, work_sessions_completed=completed, focus_minutes=minutes)
+        for owner_id, day, total, completed, minutes in sessions
+    }
+
+
+def _checkin_rows(db: Session, since: Optional[date], user_id: Optional[int]) -> RollupRows:
+    checkin_day = _day(Checkin.created_at)
+    checkins = db.query(
+        Checkin.user_id,
+        checkin_day,
+        func.count(Checkin.id),
+        func.coalesce(func.sum(Checkin.energy_rating), 0),
+        func.count(Checkin.energy_rating)
+    ).group_by(Checkin.user_id, checkin_day)
+    if since is not None:
+        checkins = checkins.filter(Checkin.created_at >= since)
+    if user_id is not None:
+        checkins = checkins.filter(Checkin.user_id == user_id)
+
+    return {
+        (owner_id, day): dict(checkins=total, energy_total=energy_total, energy_ratings=energy_ratings)
+        for owner_id, day, total, energy_total, energy_ratings in checkins
+    }
+
+
+class RollupSource(NamedTuple):
+    name: str
+    columns: Dict[str, object]  # rollup column -> value when the day has no rows
+    window_setting: str  # config field with the refresh window in days
+    build: Callable[[Session, Optional[date], Optional[int]], RollupRows]
+
+
+ROLLUP_SOURCES = (
+    RollupSource(
+        "tasks",
+        dict(tasks_created=0, tasks_done=0, tasks_in_progress=0, tasks_todo=0, done_seconds_total=0,
+             done_timed=0, tasks_completed=0, completions_by_hour={}),
+        "rollup_task_window_days",
+        _task_rows
+    ),
+    RollupSource(
+        "conversations",
+        dict(messages=0, project_switches=0, first_project=None, last_project=None),
+        "rollup_activity_window_days",
+        _conversation_rows
+    ),
+    RollupSource(
+        "work_sessions",
+        dict(work_sessions=0, work_sessions_completed=0, focus_minutes=0),
+        "rollup_activity_window_days",
+        _work_session_rows
+    ),
+    RollupSource(
+        "checkins",
+        dict(checkins=0, energy_total=0, energy_ratings=0),
+        "rollup_activity_window_days",
+        _checkin_rows
+    ),
+)
+
+
+def _refresh_source(db: Session, source: RollupSource, since: Optional[date], user_id: Optional[int]) -> int:
+    """Reset the source's columns in range, then upsert the fresh values."""
+    reset = update(UserDailyRollup).values(**source.columns, refreshed_at=func.now())
+    if since is not None:
+        reset = reset.where(UserDailyRollup.day >= since)
+    if user_id is not None:
+        reset = reset.where(UserDailyRollup.user_id == user_id)
+    db.execute(reset)
+
+    rows = source.build(db, since, user_id)
+    if not rows:
+        return 0
+
+    stmt = pg_insert(UserDailyRollup).values([
+        {**source.columns, **values, "user_id": owner_id, "day": day}
+        for (owner_id, day), values in rows.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_user_daily_rollups_user_day",
+        set_={**{column: stmt.excluded[column] for column in source.columns}, "refreshed_at": func.now()}
+    )
+    db.execute(stmt)
+    return len(rows)
+
+
+def refresh_rollups(db: Session, user_id: Optional[int] = None, full: bool = False) -> int:
+    """
+    Refresh the recent days of every source (or all of history with
+    ``full``), for one user or everyone. Returns the number of rows written.
+    """
+    from app.config import get_settings
+    settings = get_settings()
+    today = datetime.utcnow().date()
+
+    written = 0
+    oldest = None
+    for source in ROLLUP_SOURCES:
+        since = None if full else today - timedelta(days=getattr(settings, source.window_setting))
+        written += _refresh_source(db, source, since, user_id)
+        oldest = since if oldest is None or since is None else min(oldest, since)
+
+    # Readers cache on the "rollups" version
+    touched = db.query(UserDailyRollup.user_id).distinct()
+    if oldest is not None:
+        touched = touched.filter(UserDailyRollup.day >= oldest)
+    if user_id is not None:
+        touched = touched.filter(UserDailyRollup.user_id == user_id)
+    for (owner_id,) in touched:
+        data_versions.mark_changed(db, owner_id, "rollups")
+
+    db.commit()
+    return written
+
+
+def _rollups_empty(db: Session) -> bool:
+    """True until the first refresh has written anything."""
+    return db.query(UserDailyRollup.id).first() is None
+
+
+class RollupScheduler:
+    """Refreshes the rollups every ``interval_seconds`` in the background."""
+
+    def __init__(self, interval_seconds: float = 900.0):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        """
+        Start refreshing (the first refresh runs right away, over all of
+        history if nothing has been rolled up yet).
+        """
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(), name="rollup-refresh")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        from app.database import run_in_session
+
+        full = None
+        while True:
+            try:
+                if full is None:
+                    full = await run_in_session(_rollups_empty)
+                written = await run_in_session(refresh_rollups, None, full)
+                logger.info(f"Refreshed {written} daily rollups" + (" (full history)" if full else ""))
+                full = False
+            except Exception as e:
+                # Readers keep serving the last refresh; try again next round
+                logger.error(f"Rollup refresh failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+
+# Singleton instance
+_rollup_scheduler: Optional[RollupScheduler] = None
+
+
+def get_rollup_scheduler() -> RollupScheduler:
+    """Get or create the rollup scheduler singleton"""
+    global _rollup_scheduler
+    if _rollup_scheduler is None:
+        from app.config import get_settings
+        _rollup_scheduler = RollupScheduler(interval_seconds=get_settings().rollup_refresh_interval_seconds)
+    return _rollup_scheduler
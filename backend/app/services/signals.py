@@ -0,0 +1,137 @@
+"""
+Signal extraction - lowercase a message once, answer every consumer from it.
+
+Learning extraction, feedback detection and intention recording all look for
+keywords in the same user message. extract_signals returns a MessageSignals
+holding the lowercased text once; it answers each question - the phrases of
+a SIGNAL_PHRASES group, a category's SUBPATTERNS hit - only when asked, and
+keeps the costlier results (tokens, time mentions, intentions). Results are
+memoized per text, so the feedback check during the reply and the learning
+extraction and intention recording after it share one MessageSignals.
+
+Lookups are plain ``phrase in text`` checks, which run in C: a message is
+only ever checked against the few groups its consumers ask about, and that
+costs less than a Python-level pass over every character (see
+python benchmark_signals.py).
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from app.services.subpatterns import SubpatternHits, subpattern_matcher
+
+# Phrase groups, each in priority order (first match wins where it matters)
+SIGNAL_PHRASES: Dict[str, Tuple[str, ...]] = {
+    # Learning extraction
+    "deflection": ('later', 'maybe', 'not sure', "i don't know", 'eventually', 'probably'),
+    "hyperfocus": ('in the zone', 'flow', 'focused'),
+    "urgency": ('deadline', 'urgent', 'pressure'),
+    "accountability": ('waiting', 'expecting', 'deadline', 'must', 'have to'),
+    # Feedback detection
+    "feedback_trigger": (
+        'sandy, ', 'hey sandy,', 'remember ', "don't forget", 'please remember', 'from now on',
+        'stop ', "don't ", 'i prefer', 'i like when', "i don't like when", 'be more', 'be less',
+        'you should', 'can you be'
+    ),
+    "tone": ('formal', 'casual', 'friendly', 'professional', 'playful', 'serious', 'tone'),
+    "questions": ('questions', 'asking', 'stop asking', "don't ask"),
+    "directness": ('direct', 'blunt', 'straight', 'to the point'),
+    "remember": ('remember', "don't forget"),
+    "time_of_day": ('morning', 'afternoon', 'evening', 'night', 'time'),
+    "work_topic": ('task', 'work', 'project'),
+    # Pattern recognition: language that puts something off
+    "procrastination": ('later', 'tomorrow', 'soon', 'need to', 'should', 'gonna', 'going to', 'will do'),
+}
+
+TIME_MENTION_RE = re.compile(r'(\d+)\s*(minute|min|hour|hr|day)s?')
+
+# How many tokens after a procrastination phrase name the activity
+INTENTION_WORDS = 3
+
+_PHRASE_TOKENS = {phrase: tuple(phrase.split()) for phrase in SIGNAL_PHRASES["procrastination"]}
+
+
+class Intention:
+    """Something the user said they'd do later ("I'll do X tomorrow")."""
+    __slots__ = ("phrase", "activity")
+
+    def __init__(self, phrase: str, activity: str):
+        self.phrase = phrase
+        self.activity = activity
+
+    def __repr__(self):
+        return f"Intention({self.phrase!r}, {self.activity!r})"
+
+
+class MessageSignals:
+    """Everything the consumers look for in one message, worked out on first use."""
+    __slots__ = ("lower", "_subpatterns", "_tokens", "_time_mentions", "_intentions")
+
+    def __init__(self, text: str):
+        self.lower = text.lower()
+        self._subpatterns: Optional[SubpatternHits] = None
+        self._tokens: Optional[Tuple[str, ...]] = None
+        self._time_mentions: Optional[Tuple[Tuple[str, str], ...]] = None
+        self._intentions: Optional[Tuple[Intention, ...]] = None
+
+    def matched(self, group: str) -> Tuple[str, ...]:
+        """Phrases of ``group`` found in the message, in SIGNAL_PHRASES order."""
+        return tuple(filter(self.lower.__contains__, SIGNAL_PHRASES[group]))
+
+    def has(self, group: str) -> bool:
+        return any(map(self.lower.__contains__, SIGNAL_PHRASES[group]))
+
+    @property
+    def subpatterns(self) -> SubpatternHits:
+        if self._subpatterns is None:
+            self._subpatterns = subpattern_matcher.lookup(self.lower)
+        return self._subpatterns
+
+    @property
+    def tokens(self) -> Tuple[str, ...]:
+        if self._tokens is None:
+            self._tokens = tuple(self.lower.split())
+        return self._tokens
+
+    @property
+    def time_mentions(self) -> Tuple[Tuple[str, str], ...]:
+        """(amount, unit) pairs such as ('45', 'minute')."""
+        if self._time_mentions is None:
+            self._time_mentions = tuple(TIME_MENTION_RE.findall(self.lower))
+        return self._time_mentions
+
+    @property
+    def intentions(self) -> Tuple[Intention, ...]:
+        if self._intentions is None:
+            phrases = self.matched("procrastination")
+            self._intentions = _find_intentions(self.tokens, phrases) if phrases else ()
+        return self._intentions
+
+
+def _find_intentions(tokens: Tuple[str, ...], phrases: Tuple[str, ...]) -> Tuple[Intention, ...]:
+    """The next few tokens after the first occurrence of each phrase."""
+    intentions = []
+    for phrase in phrases:
+        phrase_tokens = _PHRASE_TOKENS[phrase]
+        head, n = phrase_tokens[0], len(phrase_tokens)
+        # Candidates start where the phrase's first token does
+        start = 0
+        for _ in range(tokens.count(head)):
+            i = tokens.index(head, start)
+            if tokens[i:i + n] == phrase_tokens:
+                if i + n < len(tokens):
+                    intentions.append(Intention(phrase, " ".join(tokens[i + n:i + n + INTENTION_WORDS])))
+                break
+            start = i + 1
+    return tuple(intentions)
+
+
+@lru_cache(maxsize=2048)
+def extract_signals(text: str) -> MessageSignals:
+    """Signals for ``text`` (memoized; the result is shared - don't mutate it)."""
+    return MessageSignals(text)
+
+
+def joined_subpatterns(message: str, other: str) -> SubpatternHits:
+    """Subpatterns of f"{message} {other}", reusing the message's lowercased text."""
+    return subpattern_matcher.lookup(f"{extract_signals(message).lower} {other.lower()}")
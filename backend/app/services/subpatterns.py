@@ -1,6 +1,7 @@
 """
 SUBPATTERN DEFINITIONS - Machine-readable format for learning system
 """
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
 
 # Map of category -> list of (subpattern_key, keywords, description)
 SUBPATTERNS = {
@@ -150,6 +151,88 @@ SUBPATTERNS = {
 }
 
 
+class CategoryTable(NamedTuple):
+    """One category's subpatterns, compiled for matching."""
+    entries: List[Tuple[str, Tuple[str, ...]]]  # (subpattern key, lowercased keywords) in table order
+    keywords: Tuple[str, ...]  # every entry's keywords, in entry order
+    owners: Dict[str, str]  # keyword -> first subpattern key listing it
+
+
+class SubpatternHits:
+    """
+    Subpatterns found in one text, resolved per category on demand, in
+    SUBPATTERNS order.
+
+    ``contains`` tells whether a keyword occurs (substring search in the
+    lowercased text), so each asked-for category costs only its own checks.
+    """
+    __slots__ = ("_contains", "_table", "_categories")
+
+    def __init__(
+        self,
+        table: Dict[str, CategoryTable],
+        contains: Callable[[str], bool],
+        categories: Optional[FrozenSet[str]] = None
+    ):
+        self._table = table
+        self._contains = contains
+        self._categories = categories
+
+    def _category(self, category: str) -> Optional[CategoryTable]:
+        if self._categories is None or category in self._categories:
+            return self._table.get(category)
+        return None
+
+    def first(self, category: str) -> Optional[str]:
+        """First matching subpattern in table order (get_subpattern semantics)."""
+        table = self._category(category)
+        if table is None:
+            return None
+        # Keywords are in entry order, so the first one found belongs to
+        # the first matching subpattern
+        keyword = next(filter(self._contains, table.keywords), None)
+        return table.owners[keyword] if keyword is not None else None
+
+    def all(self, category: str) -> List[str]:
+        """Every matching subpattern for ``category``."""
+        table = self._category(category)
+        if table is None:
+            return []
+        contains = self._contains
+        return [key for key, keywords in table.entries if any(map(contains, keywords))]
+
+    def categories(self) -> List[str]:
+        """Categories with at least one match."""
+        return [category for category in self._table if self.first(category)]
+
+
+def _category_table(entries: list) -> CategoryTable:
+    compiled = [(key, tuple(dict.fromkeys(k.lower() for k in keywords))) for key, keywords, _ in entries]
+    owners: Dict[str, str] = {}
+    for key, keywords in compiled:
+        for keyword in keywords:
+            owners.setdefault(keyword, key)
+    return CategoryTable(compiled, tuple(keyword for _, keywords in compiled for keyword in keywords), owners)
+
+
+class SubpatternMatcher:
+    """SUBPATTERNS keywords compiled into per-category lookup tables."""
+
+    def __init__(self, subpatterns: Dict[str, list]):
+        self._table = {category: _category_table(entries) for category, entries in subpatterns.items()}
+
+    def lookup(self, lower_text: str, categories: Optional[Iterable[str]] = None) -> SubpatternHits:
+        """Hits in an already lowercased text, checked only for the categories asked for."""
+        return SubpatternHits(self._table, lower_text.__contains__, _frozen(categories))
+
+
+def _frozen(categories: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+    return frozenset(categories) if categories is not None else None
+
+
+subpattern_matcher = SubpatternMatcher(SUBPATTERNS)
+
+
 def get_subpattern(category: str, text: str) -> str:
     """
     Detect which subpattern matches the text.
@@ -164,13 +247,7 @@ def get_subpattern(category: str, text: str) -> str:
     if category not in SUBPATTERNS:
         return None
     
-    text_lower = text.lower()
-    
-    for subpattern_key, keywords, _ in SUBPATTERNS[category]:
-        if any(keyword in text_lower for keyword in keywords):
-            return subpattern_key
-    
-    return None
+    return subpattern_matcher.lookup(text.lower()).first(category)
 
 
 def get_subpattern_description(category: str, subpattern_key: str) -> str:
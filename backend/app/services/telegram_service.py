@@ -1,20 +1,29 @@
 """Telegram bot service for ADHD Coach."""
+import asyncio
 import os
 import logging
 import re
 import json
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import datetime, time
 import pytz
 
 from telegram import Update, Bot
+from telegram.error import RetryAfter, TelegramError
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 
-from app.database import get_db
+from sqlalchemy import select
+
+from app.database import get_db, run_in_async_session, run_in_session
 from app.models.user import User
+from app.services.user_cache import aget_chat_user, get_chat_user, get_chat_user_cache
+from app.services.write_behind import PostReplyJob, get_write_behind_queue
 
 logger = logging.getLogger(__name__)
 
+# Appended to a streamed reply whose stream broke partway
+STREAM_INTERRUPTED_NOTICE = "⚠️ My reply got cut off - ask me to continue if you need the rest."
+
 
 class TelegramService:
     """Service for managing Telegram bot interactions."""
@@ -23,6 +32,7 @@ class TelegramService:
         self.token = token
         self.bot = Bot(token=token)
         self.application = None
+        self._memory_warmup = None
         
     async def initialize(self):
         """Initialize the Telegram application."""
@@ -40,52 +50,39 @@ class TelegramService:
         await self.application.initialize()
         await self.application.start()
         
+        # Workers for post-reply persistence (replays anything spooled before a restart)
+        await get_write_behind_queue().start()
+        
+        # Keep the daily analytics rollups fresh
+        from app.services.rollups import get_rollup_scheduler
+        await get_rollup_scheduler().start()
+        
+        # Build the memory service in the background; retrieval is skipped until ready
+        from app.services.memory import warm_memory_service
+        self._memory_warmup = asyncio.create_task(warm_memory_service())
+        
         logger.info("Telegram bot initialized successfully")
     
+    async def stop_memory_warmup(self):
+        """Cancel the memory warmup if it is still retrying (call before closing clients)."""
+        task, self._memory_warmup = self._memory_warmup, None
+        if task and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command - creates user if needed."""
         chat_id = update.effective_chat.id
         username = update.effective_user.username
         first_name = update.effective_user.first_name or "User"
 
-        db = next(get_db())
         try:
-            # Check if user already exists by telegram_chat_id
-            user = db.query(User).filter(User.telegram_chat_id == chat_id).first()
-
-            if not user:
-                # Check if test user exists without telegram link
-                user = db.query(User).filter(User.email == "user@example.com").first()
-
-                if user:
-                    # Link existing user to this Telegram account
-                    user.telegram_chat_id = chat_id
-                    user.telegram_username = username
-                    db.commit()
-                else:
-                    # Create new user automatically for Telegram
-                    from datetime import datetime
-                    import bcrypt
-
-                    # Generate a random password (user won't need it for Telegram)
-                    random_password = bcrypt.hashpw(b"telegram_user", bcrypt.gensalt()).decode('utf-8')
-
-                    user = User(
-                        email=f"telegram_{chat_id}@sandy.local",
-                        password_hash=random_password,
-                        name=first_name,
-                        telegram_chat_id=chat_id,
-                        telegram_username=username,
-                        timezone="UTC",
-                        created_at=datetime.utcnow(),
-                        updated_at=datetime.utcnow()
-                    )
-                    db.add(user)
-                    db.commit()
+            morning_briefing_time = await run_in_session(_connect_user, chat_id, username, first_name)
+            get_chat_user_cache().invalidate(chat_id)
 
             await update.message.reply_text(
                 "🤖 *ADHD Coach Connected!*\n\n"
-                f"Morning briefing set for {user.morning_briefing_time}\n"
+                f"Morning briefing set for {morning_briefing_time}\n"
                 "I'll send you:\n"
                 "• Daily focus recommendations\n"
                 "• Task confirmations\n\n"
@@ -97,26 +94,17 @@ class TelegramService:
             await update.message.reply_text(
                 "⚠️ Sorry, there was an error connecting your account. Please try again."
             )
-        finally:
-            db.close()
     
     async def stop_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /stop command."""
         chat_id = update.effective_chat.id
         
-        db = next(get_db())
-        try:
-            user = db.query(User).filter(User.telegram_chat_id == chat_id).first()
-            if user:
-                user.telegram_chat_id = None
-                user.telegram_username = None
-                db.commit()
-                
-                await update.message.reply_text(
-                    "👋 Disconnected. Use /start to reconnect anytime."
-                )
-        finally:
-            db.close()
+        disconnected = await run_in_session(_disconnect_user, chat_id)
+        get_chat_user_cache().invalidate(chat_id)
+        if disconnected:
+            await update.message.reply_text(
+                "👋 Disconnected. Use /start to reconnect anytime."
+            )
     
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command."""
@@ -136,301 +124,149 @@ class TelegramService:
         chat_id = update.effective_chat.id
         args = context.args or []
         
-        db = next(get_db())
-        try:
-            user = db.query(User).filter(User.telegram_chat_id == chat_id).first()
-            if not user:
-                await update.message.reply_text("⚠️ Please use /start first.")
-                return
-            
-            from app.services.exploration import ExplorationService
-            
-            explorer = ExplorationService(user.id, db)
-            
-            # Check if user specified a category
-            if args:
-                category_name = " ".join(args)
-                category = explorer.get_category_by_name(category_name)
-                
-                if not category:
-                    await update.message.reply_text(
-                        f"❌ Couldn't find category matching '{category_name}'\n\n"
-                        "Try: /explore task_initiation or just /explore to let me pick!"
-                    )
-                    return
-            else:
-                # Pick next category to explore
-                category = explorer.pick_next_category()
-                
-                if not category:
-                    await update.message.reply_text(
-                        "✅ You're doing great! No urgent areas to explore right now."
-                    )
-                    return
-            
-            # Get questions for this category
-            questions = explorer.get_exploration_guidance(category['category_name'])
-            
-            # Build message
-            message = f"Let's explore: *{category['description']}*\n\n"
-            message += f"Current understanding: {category['confidence']}%\n"
-            message += f"Observations so far: {category['observations']}\n\n"
-            
-            if category['hypothesis']:
-                message += f"💭 Working hypothesis:\n_{category['hypothesis']}_\n\n"
-            
-            message += "Here are some questions to explore:\n"
-            for q in questions[:3]:  # First 3 questions
-                message += f"• {q}\n"
-            
-            message += "\nJust answer naturally - I'll learn from our conversation!"
-            
-            await update.message.reply_text(message, parse_mode='Markdown')
-        
-        finally:
-            db.close()
+        message, parse_mode = await run_in_session(_explore_reply, chat_id, args)
+        await update.message.reply_text(message, parse_mode=parse_mode)
     
     async def patterns_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /patterns command - show what Sandy knows."""
         chat_id = update.effective_chat.id
         
-        db = next(get_db())
-        try:
-            user = db.query(User).filter(User.telegram_chat_id == chat_id).first()
-            if not user:
-                await update.message.reply_text("⚠️ Please use /start first.")
-                return
-            
-            # Use shared service (same as API)
-            from app.services.pattern_learning import PatternLearningService
-            from app.services.exploration import ExplorationService
-            
-            learner = PatternLearningService(user.id, db)
-            explorer = ExplorationService(user.id, db)
-            
-            # Get confirmed patterns
-            confirmed = learner.get_confirmed_patterns(min_confidence=80)
-            
-            if not confirmed:
-                await update.message.reply_text(
-                    "I'm still learning about you! 📚\n\n"
-                    "We need more conversations before I can identify solid patterns.\n"
-                    "Keep chatting with me and I'll start to understand what works for you!"
-                )
-                return
-            
-            message = "🧠 *What I know about you* (80%+ confidence):\n\n"
-            
-            for pattern in confirmed:
-                cat_name = pattern['category'].replace('_', ' ').title()
-                message += f"✅ *{cat_name}*\n"
-                message += f"   {pattern['hypothesis']}\n"
-                message += f"   _(Confidence: {pattern['confidence']}%)_\n\n"
-            
-            # Get categories still learning
-            all_status = explorer.get_all_categories_status()
-            learning = [c for c in all_status if c['confidence'] < 80]
-            
-            if learning:
-                message += "📖 *Still learning about:*\n"
-                for cat in learning[:5]:  # Show first 5
-                    cat_name = cat['category'].replace('_', ' ').title()
-                    message += f"• {cat_name} ({cat['confidence']}%)\n"
-                
-                if len(learning) > 5:
-                    message += f"...and {len(learning) - 5} more\n"
-            
-            message += "\nUse /explore to dive deeper into any area!"
-            
-            await update.message.reply_text(message, parse_mode='Markdown')
-        
-        finally:
-            db.close()
+        message, parse_mode = await run_in_session(_patterns_reply, chat_id)
+        await update.message.reply_text(message, parse_mode=parse_mode)
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle regular text messages."""
+        """
+        Handle regular text messages.
+        
+        Every blocking step (DB work, embeddings, Pinecone, the LLM call) is
+        awaited off the event loop, so one slow reply never stalls other chats.
+        """
         chat_id = update.effective_chat.id
         user_message = update.message.text
         
-        # Find user by Telegram chat_id
-        db = next(get_db())
-        try:
-            user = db.query(User).filter(User.telegram_chat_id == chat_id).first()
-            if not user:
-                await update.message.reply_text(
-                    "⚠️ Please use /start to connect your account first."
-                )
-                return
-            
-            # Get AI response
-            from app.services.ai import get_ai_response
-            from app.services.context import build_context_for_ai, format_context_for_prompt
-
-            # Get user profile
-            user_profile = user.adhd_profile or {}
-
-            # Get current context (projects, tasks, etc.)
-            try:
-                context_data = build_context_for_ai(user.id, db)
-                context_str = format_context_for_prompt(context_data)
-            except Exception as e:
-                logger.warning(f"Error building context: {e}")
-                context_data = {}
-                context_str = ""
-            
-            # Get relevant long-term memories using Pinecone (SAME AS WEB CHAT)
-            relevant_memories = []
+        # Find user by Telegram chat_id (usually a cache hit, no DB trip)
+        cached_user = get_chat_user_cache().get(chat_id)
+        if cached_user is not None:
+            user_id = cached_user.id
+        else:
             try:
-                from app.services.memory import get_memory_service
-                memory_service = get_memory_service()
-
-                relevant_memories = memory_service.search_relevant_memories(
-                    query=user_message,
-                    user_id=user.id,
-                    top_k=3,
-                    exclude_session=f"user_{user.id}_global"
-                )
+                user_id = await _lookup_user_id(chat_id)
             except Exception as e:
-                logger.warning(f"Memory service unavailable: {e}")
-                # Continue without memories
-            
-            # Get recent conversation history (last 10 messages from ANY interface)
-            from app.models.conversation import Conversation
-            from datetime import datetime, timedelta
-            from app.services.pattern_learning import PatternLearningService  # CORRECT learning system
-            
-            # FIXED: Removed 2-hour time limit - get ALL recent conversations
-            recent_convos = db.query(Conversation).filter(
-                Conversation.user_id == user.id
-            ).order_by(Conversation.created_at.desc()).limit(10).all()
-            
-            # Build conversation history (most recent first, so reverse it)
-            conversation_history = []
-            for conv in reversed(recent_convos):
-                conversation_history.append({"role": "user", "content": conv.user_message})
-                conversation_history.append({"role": "assistant", "content": conv.ai_response})
-            
-            # Call AI service with context data (includes learned patterns) AND relevant memories
-            try:
-                response = get_ai_response(
-                    user_message=user_message,
-                    user_id=user.id,
-                    db=db,
-                    conversation_history=conversation_history,
-                    context=context_data,  # This now includes learned_patterns and exploration_status
-                    relevant_memories=relevant_memories  # Long-term memory from Pinecone
+                logger.error(f"Error looking up user for chat {chat_id}: {e}")
+                await update.message.reply_text(
+                    "Sorry, I'm having trouble thinking right now. Please try again!"
                 )
-
-                # DEBUG: Log the raw response
-                logger.info(f"Raw AI response: {response}")
-            except Exception as e:
-                logger.error(f"Error getting AI response: {e}")
-                await update.message.reply_text("Sorry, I'm having trouble thinking right now. Please try again!")
                 return
-            
-            # DETECT AND APPLY FEEDBACK (if user is giving Sandy instructions)
-            feedback_confirmation = None
+        if user_id is None:
+            await update.message.reply_text(
+                "⚠️ Please use /start to connect your account first."
+            )
+            return
+        
+        session_id = f"user_{user_id}_global"  # SHARED session across all interfaces
+        
+        # Context (projects, tasks, patterns), long-term memories (Pinecone) and
+        # recent history (last 10 messages from ANY interface) are independent,
+        # so fetch them concurrently. Each has its own budget; a source that is
+        # slow or failing is dropped and the reply goes ahead without it.
+        from app.config import get_settings
+        settings = get_settings()
+        
+        context_data, relevant_memories, conversation_history = await asyncio.gather(
+            _within_budget(
+                "context",
+                _db_read(_load_context, _aload_context, user_id),
+                settings.context_timeout_seconds,
+                default={}
+            ),
+            _within_budget(
+                "memory",
+                _search_memories(user_message, user_id, session_id),
+                settings.memory_timeout_seconds,
+                default=[]
+            ),
+            _within_budget(
+                "history",
+                _db_read(_load_conversation_history, _aload_conversation_history, user_id),
+                settings.history_timeout_seconds,
+                default=[]
+            ),
+        )
+        
+        # DETECT AND APPLY FEEDBACK (if user is giving Sandy instructions).
+        # Independent of the model output, so it runs while the reply generates.
+        feedback_task = asyncio.create_task(run_in_session(_apply_feedback, user_message, user_id))
+        
+        # Call AI service with context data (includes learned patterns) AND relevant memories
+        llm_kwargs = dict(
+            user_message=user_message,
+            user_id=user_id,
+            conversation_history=conversation_history,
+            context=context_data,  # This now includes learned_patterns and exploration_status
+            relevant_memories=relevant_memories  # Long-term memory from Pinecone
+        )
+        reply = _StreamingReply(update.message, settings.stream_edit_interval_seconds)
+        
+        interrupted = False
+        if settings.stream_responses:
+            response, interrupted = await _stream_into_reply(reply, llm_kwargs)
+        else:
             try:
-                from app.services.feedback import detect_feedback, apply_feedback
-
-                feedback_data = detect_feedback(user_message)
-
-                if feedback_data['is_feedback']:
-                    feedback_confirmation = apply_feedback(feedback_data, user.id, db)
-                    logger.info(f"Applied feedback: {feedback_data['instruction']}")
+                from app.services.ai import get_ai_response
+                response = await get_ai_response(**llm_kwargs)
             except Exception as e:
-                logger.warning(f"Error processing feedback: {e}")
-
-            # Initialize actions list
-            actions = []
-
-            # Also try to parse raw JSON if AI didn't use code blocks
-            if not actions:
-                # Look for raw JSON objects at start of response
-                json_pattern = r'^[✅❌]?\s*[A-Z_]+\s*\{.*?\}\s*\n'
-                match = re.match(json_pattern, response, re.DOTALL)
-                if match:
-                    try:
-                        json_str = match.group(0).strip()
-                        # Remove emoji and label
-                        json_str = re.sub(r'^[✅❌]?\s*[A-Z_]+\s*', '', json_str)
-                        action = json.loads(json_str)
-                        actions = [action]
-                    except:
-                        pass
-            
-            # Clean response FIRST - remove action blocks
-            clean_response = response
-            
-            # Remove ```action blocks (with proper newlines)
-            clean_response = re.sub(r'```action\s*\n.*?\n```', '', clean_response, flags=re.DOTALL)
-            
-            # Remove any remaining ```action blocks without closing
-            clean_response = re.sub(r'```action\s*\n.*', '', clean_response, flags=re.DOTALL)
-            
-            # Remove raw JSON at start
-            clean_response = re.sub(r'^[✅❌]?\s*[A-Z_]+\s*\{.*?\}\s*\n', '', clean_response, flags=re.DOTALL)
-            
-            clean_response = clean_response.strip()
-            
-            # Add feedback confirmation if user gave feedback
+                logger.error(f"Error getting AI response: {e}")
+                response = None
+        
+        # The feedback is applied whether or not a reply comes, so always
+        # collect its confirmation
+        feedback_confirmation = None
+        try:
+            feedback_confirmation = await feedback_task
+        except Exception as e:
+            logger.warning(f"Error processing feedback: {e}")
+        
+        if response is None:
+            error_message = "Sorry, I'm having trouble thinking right now. Please try again!"
             if feedback_confirmation:
-                clean_response = f"{feedback_confirmation}\n\n{clean_response}" if clean_response else feedback_confirmation
-            
-            logger.info(f"Cleaned response: {clean_response}")
+                error_message = f"{feedback_confirmation}\n\n{error_message}"
+            await reply.finish(error_message)
+            return
 
+        # DEBUG: Log the raw response
+        logger.info(f"Raw AI response: {response}")
+        
+        clean_response = _clean_response(response)
+        
+        # A cut-off reply says so - to the user, and in the saved exchange
+        # and memory, so later context doesn't take it for the whole answer
+        if interrupted:
+            clean_response = f"{clean_response}\n\n{STREAM_INTERRUPTED_NOTICE}" if clean_response else STREAM_INTERRUPTED_NOTICE
+        
+        # Add feedback confirmation if user gave feedback
+        if feedback_confirmation:
+            clean_response = f"{feedback_confirmation}\n\n{clean_response}" if clean_response else feedback_confirmation
+        
+        logger.info(f"Cleaned response: {clean_response}")
+
+        try:
             # SEND RESPONSE - always send something
             if clean_response:
-                await update.message.reply_text(clean_response)
+                await reply.finish(clean_response)
             else:
                 # Fallback if response was completely stripped
-                await update.message.reply_text("I heard you! Let me think about that...")
-            
-            # REAL-TIME LEARNING - Extract and save patterns immediately
-            try:
-                from app.services.learning_extraction import extract_and_save_learnings
-
-                learnings = extract_and_save_learnings(
-                    user_message=user_message,
-                    ai_response=clean_response or response,
-                    user_id=user.id,
-                    db=db,
-                    action_result=None  # No action was executed in this flow
-                )
-
-                if learnings:
-                    logger.info(f"Extracted {len(learnings)} learnings from interaction")
-            except Exception as e:
-                logger.warning(f"Error extracting learnings: {e}")
-            
-            # Save conversation to database for history
-            # Use user-based session_id for cross-platform sync
-            from app.models.conversation import Conversation
-            conversation = Conversation(
-                user_id=user.id,
+                await reply.finish("I heard you! Let me think about that...")
+        finally:
+            # Saving the exchange, learning extraction and the Pinecone memory
+            # happen on the write-behind queue so the handler is done here.
+            # Queued even if the final edit fails - the reply was generated
+            # (and usually already streamed to the user).
+            await get_write_behind_queue().submit(PostReplyJob(
+                user_id=user_id,
                 user_message=user_message,
                 ai_response=clean_response or response,
-                session_id=f"user_{user.id}_global",  # SHARED session across all interfaces
-                input_type="telegram"
-            )
-            db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
-            
-            # Store to Pinecone for long-term memory (SAME AS WEB CHAT)
-            try:
-                memory_service.store_conversation(
-                    conversation_id=conversation.id,
-                    user_id=user.id,
-                    user_message=user_message,
-                    ai_response=clean_response or response,
-                    session_id=f"user_{user.id}_global"
-                )
-            except Exception as e:
-                logger.error(f"Failed to store conversation in Pinecone: {e}")
-            
-        finally:
-            db.close()
+                session_id=session_id
+            ))
     
     async def send_message(self, chat_id: int, message: str, parse_mode: Optional[str] = None):
         """Send a message to a specific chat."""
@@ -446,88 +282,461 @@ class TelegramService:
     
     async def send_morning_briefing(self, user_id: int):
         """Send morning briefing to a user."""
+        chat_id = await run_in_session(_load_chat_id, user_id)
+        if not chat_id:
+            return
+        
+        # The briefing generator takes a session of its own
         db = next(get_db())
         try:
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user or not user.telegram_chat_id:
-                return
-            
             # Generate briefing content
             from app.services.ai import generate_morning_briefing
             briefing = await generate_morning_briefing(user_id, db)
-            
-            # Format with emojis
-            formatted_briefing = (
-                "🌅 *GOOD MORNING*\n\n"
-                f"{briefing}\n\n"
-                "_Reply to add tasks or ask questions_"
-            )
-            
-            await self.send_message(
-                chat_id=user.telegram_chat_id,
-                message=formatted_briefing,
-                parse_mode='Markdown'
-            )
-            
         finally:
             db.close()
+        
+        # Format with emojis
+        formatted_briefing = (
+            "🌅 *GOOD MORNING*\n\n"
+            f"{briefing}\n\n"
+            "_Reply to add tasks or ask questions_"
+        )
+        
+        await self.send_message(
+            chat_id=chat_id,
+            message=formatted_briefing,
+            parse_mode='Markdown'
+        )
     
     async def send_action_confirmation(self, user_id: int, action_type: str, details: dict):
         """Send action confirmation message."""
-        db = next(get_db())
+        chat_id = await run_in_session(_load_chat_id, user_id)
+        if not chat_id:
+            return
+        
+        # Format based on action type
+        if action_type == "calendar_event":
+            message = (
+                "✅ *ADDED TO CALENDAR*\n"
+                f"📅 {details.get('title')}\n"
+                f"🕐 {details.get('start_time')}\n"
+            )
+            if details.get('location'):
+                message += f"📍 {details.get('location')}\n"
+        
+        elif action_type == "create_task":
+            message = (
+                "✅ *ADDED TASK*\n"
+                f"🎯 {details.get('title')}\n"
+            )
+            if details.get('priority'):
+                message += f"🔥 Priority: {details.get('priority')}\n"
+            if details.get('estimated_minutes'):
+                message += f"⏱️ Est. time: {details.get('estimated_minutes')} min\n"
+        
+        elif action_type == "create_project":
+            message = (
+                "✅ *CREATED PROJECT*\n"
+                f"📋 {details.get('title')}\n"
+            )
+            if details.get('deadline'):
+                message += f"⏰ Deadline: {details.get('deadline')}\n"
+            if details.get('estimated_hours'):
+                message += f"📊 Est. hours: {details.get('estimated_hours')}\n"
+        
+        elif action_type == "move_to_backburner":
+            message = (
+                "💡 *MOVED TO BACKBURNER*\n"
+                f"🗂️ {details.get('title')}\n"
+                "📝 I'll remind you when the time is right\n"
+            )
+        
+        else:
+            message = f"✅ *{action_type.upper()}*\n{details}"
+        
+        await self.send_message(
+            chat_id=chat_id,
+            message=message,
+            parse_mode='Markdown'
+        )
+
+
+class _StreamingReply:
+    """
+    One Telegram reply that is sent on the first visible text and then
+    edited in place, at most once per ``min_interval`` seconds.
+    """
+    
+    def __init__(self, message, min_interval: float):
+        self.message = message
+        self.min_interval = min_interval
+        self.sent = None
+        self.sent_text = ""
+        self.next_edit_at = 0.0
+    
+    def due(self) -> bool:
+        return asyncio.get_running_loop().time() >= self.next_edit_at
+    
+    async def show(self, text: str):
+        """Show partial text if the edit budget allows; never raises."""
+        if not text or text == self.sent_text or not self.due():
+            return
         try:
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user or not user.telegram_chat_id:
-                return
-            
-            # Format based on action type
-            if action_type == "calendar_event":
-                message = (
-                    "✅ *ADDED TO CALENDAR*\n"
-                    f"📅 {details.get('title')}\n"
-                    f"🕐 {details.get('start_time')}\n"
-                )
-                if details.get('location'):
-                    message += f"📍 {details.get('location')}\n"
-            
-            elif action_type == "create_task":
-                message = (
-                    "✅ *ADDED TASK*\n"
-                    f"🎯 {details.get('title')}\n"
-                )
-                if details.get('priority'):
-                    message += f"🔥 Priority: {details.get('priority')}\n"
-                if details.get('estimated_minutes'):
-                    message += f"⏱️ Est. time: {details.get('estimated_minutes')} min\n"
-            
-            elif action_type == "create_project":
-                message = (
-                    "✅ *CREATED PROJECT*\n"
-                    f"📋 {details.get('title')}\n"
-                )
-                if details.get('deadline'):
-                    message += f"⏰ Deadline: {details.get('deadline')}\n"
-                if details.get('estimated_hours'):
-                    message += f"📊 Est. hours: {details.get('estimated_hours')}\n"
-            
-            elif action_type == "move_to_backburner":
-                message = (
-                    "💡 *MOVED TO BACKBURNER*\n"
-                    f"🗂️ {details.get('title')}\n"
-                    "📝 I'll remind you when the time is right\n"
-                )
-            
-            else:
-                message = f"✅ *{action_type.upper()}*\n{details}"
-            
-            await self.send_message(
-                chat_id=user.telegram_chat_id,
-                message=message,
-                parse_mode='Markdown'
+            await self._send(text)
+        except RetryAfter as e:
+            self.next_edit_at = asyncio.get_running_loop().time() + e.retry_after
+        except TelegramError as e:
+            logger.warning(f"Streaming edit failed: {e}")
+    
+    async def finish(self, text: str):
+        """Deliver the final text, waiting out Telegram's flood control once if needed."""
+        if text == self.sent_text:
+            return
+        try:
+            await self._send(text)
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            await self._send(text)
+    
+    async def _send(self, text: str):
+        if self.sent is None:
+            self.sent = await self.message.reply_text(text)
+        else:
+            await self.sent.edit_text(text)
+        self.sent_text = text
+        self.next_edit_at = asyncio.get_running_loop().time() + self.min_interval
+
+
+async def _stream_into_reply(reply: _StreamingReply, llm_kwargs: dict) -> Tuple[Optional[str], bool]:
+    """
+    Stream the model output into ``reply``; returns (raw response, interrupted).
+    
+    The response is None if the stream failed before producing any text; a
+    stream that breaks midway keeps what was received and is flagged as
+    interrupted.
+    """
+    from app.services.ai import stream_ai_response
+
+    chunks = []
+    try:
+        async for delta in stream_ai_response(**llm_kwargs):
+            chunks.append(delta)
+            if reply.due():
+                await reply.show(_visible_partial_response("".join(chunks)))
+    except Exception as e:
+        logger.error(f"Error streaming AI response: {e}")
+        if not chunks:
+            return None, False
+        return "".join(chunks), True
+    
+    return "".join(chunks), False
+
+
+async def _within_budget(source: str, awaitable, timeout: float, default):
+    """Await one retrieval source, returning ``default`` if it fails or runs past ``timeout``."""
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Skipping {source}: exceeded {timeout}s budget")
+    except Exception as e:
+        logger.warning(f"Skipping {source}: {e}")
+    return default
+
+
+async def _search_memories(user_message: str, user_id: int, session_id: str) -> list:
+    """Relevant long-term memories for this message (embedding + vector query)."""
+    from app.services.memory import get_memory_service_if_ready
+
+    # Never wait for a cold memory service - answer without memories instead
+    memory_service = get_memory_service_if_ready()
+    if memory_service is None:
+        logger.info("Memory service still warming up - skipping retrieval")
+        return []
+
+    return await memory_service.asearch_relevant_memories(
+        query=user_message,
+        user_id=user_id,
+        top_k=3,
+        exclude_session=session_id
+    )
+
+
+def _db_read(load, aload, *args):
+    """
+    Awaitable for a hot read: ``aload`` on the async engine, or ``load`` on
+    the sync worker pool when db_async_reads is off. Both take the same
+    arguments after the session and return the same result.
+    """
+    from app.config import get_settings
+    if get_settings().db_async_reads:
+        return run_in_async_session(aload, *args)
+    return run_in_session(load, *args)
+
+
+async def _lookup_user_id(chat_id: int) -> Optional[int]:
+    """
+    The user for a chat via _db_read. The handler can't go on without it, so
+    a failed async read is retried once on the sync worker pool.
+    """
+    from app.config import get_settings
+    try:
+        return await _db_read(_load_user_id, _aload_user_id, chat_id)
+    except Exception as e:
+        if not get_settings().db_async_reads:
+            raise
+        logger.warning(f"Async user lookup failed, retrying on the worker pool: {e}")
+        return await run_in_session(_load_user_id, chat_id)
+
+
+def _load_user_id(db, chat_id: int) -> Optional[int]:
+    """Resolve a Telegram chat_id to our user id."""
+    user = get_chat_user(db, chat_id)
+    return user.id if user else None
+
+
+async def _aload_user_id(session, chat_id: int) -> Optional[int]:
+    user = await aget_chat_user(session, chat_id)
+    return user.id if user else None
+
+
+def _load_chat_id(db, user_id: int) -> Optional[int]:
+    """Telegram chat_id of a user, None if not connected."""
+    return db.query(User.telegram_chat_id).filter(User.id == user_id).scalar()
+
+
+def _connect_user(db, chat_id: int, username: Optional[str], first_name: str) -> str:
+    """Link (or create) the user for this chat; returns their morning briefing time."""
+    # Check if user already exists by telegram_chat_id
+    user = db.query(User).filter(User.telegram_chat_id == chat_id).first()
+
+    if not user:
+        # Check if test user exists without telegram link
+        user = db.query(User).filter(User.email == "user@example.com").first()
+
+        if user:
+            # Link existing user to this Telegram account
+            user.telegram_chat_id = chat_id
+            user.telegram_username = username
+            db.commit()
+        else:
+            # Create new user automatically for Telegram
+            from datetime import datetime
+            import bcrypt
+
+            # Generate a random password (user won't need it for Telegram)
+            random_password = bcrypt.hashpw(b"telegram_user", bcrypt.gensalt()).decode('utf-8')
+
+            user = User(
+                email=f"telegram_{chat_id}@sandy.local",
+                password_hash=random_password,
+                name=first_name,
+                telegram_chat_id=chat_id,
+                telegram_username=username,
+                timezone="UTC",
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow()
             )
-            
-        finally:
-            db.close()
+            db.add(user)
+            db.commit()
+
+    return user.morning_briefing_time
+
+
+def _disconnect_user(db, chat_id: int) -> bool:
+    """Unlink the user from this chat; False if no user was linked."""
+    user = db.query(User).filter(User.telegram_chat_id == chat_id).first()
+    if not user:
+        return False
+    user.telegram_chat_id = None
+    user.telegram_username = None
+    db.commit()
+    return True
+
+
+def _explore_reply(db, chat_id: int, args: list) -> Tuple[str, Optional[str]]:
+    """/explore reply text and parse mode."""
+    user_id = _load_user_id(db, chat_id)
+    if not user_id:
+        return "⚠️ Please use /start first.", None
+
+    from app.services.exploration import ExplorationService
+
+    explorer = ExplorationService(user_id, db)
+
+    # Check if user specified a category
+    if args:
+        category_name = " ".join(args)
+        category = explorer.get_category_by_name(category_name)
+
+        if not category:
+            return (
+                f"❌ Couldn't find category matching '{category_name}'\n\n"
+                "Try: /explore task_initiation or just /explore to let me pick!"
+            ), None
+    else:
+        # Pick next category to explore
+        category = explorer.pick_next_category()
+
+        if not category:
+            return "✅ You're doing great! No urgent areas to explore right now.", None
+
+    # Get questions for this category
+    questions = explorer.get_exploration_guidance(category['category_name'])
+
+    # Build message
+    message = f"Let's explore: *{category['description']}*\n\n"
+    message += f"Current understanding: {category['confidence']}%\n"
+    message += f"Observations so far: {category['observations']}\n\n"
+
+    if category['hypothesis']:
+        message += f"💭 Working hypothesis:\n_{category['hypothesis']}_\n\n"
+
+    message += "Here are some questions to explore:\n"
+    for q in questions[:3]:  # First 3 questions
+        message += f"• {q}\n"
+
+    message += "\nJust answer naturally - I'll learn from our conversation!"
+    return message, 'Markdown'
+
+
+def _patterns_reply(db, chat_id: int) -> Tuple[str, Optional[str]]:
+    """/patterns reply text and parse mode."""
+    user_id = _load_user_id(db, chat_id)
+    if not user_id:
+        return "⚠️ Please use /start first.", None
+
+    # Use shared service (same as API)
+    from app.services.pattern_learning import PatternLearningService
+    from app.services.exploration import ExplorationService
+
+    learner = PatternLearningService(user_id, db)
+    explorer = ExplorationService(user_id, db)
+
+    # Get confirmed patterns
+    confirmed = learner.get_confirmed_patterns(min_confidence=80)
+
+    if not confirmed:
+        return (
+            "I'm still learning about you! 📚\n\n"
+            "We need more conversations before I can identify solid patterns.\n"
+            "Keep chatting with me and I'll start to understand what works for you!"
+        ), None
+
+    message = "🧠 *What I know about you* (80%+ confidence):\n\n"
+
+    for pattern in confirmed:
+        cat_name = pattern.category.replace('_', ' ').title()
+        message += f"✅ *{cat_name}*\n"
+        message += f"   {pattern.hypothesis}\n"
+        message += f"   _(Confidence: {pattern.confidence}%)_\n\n"
+
+    # Get categories still learning
+    all_status = explorer.get_all_categories_status()
+    learning = [c for c in all_status if c['confidence'] < 80]
+
+    if learning:
+        message += "📖 *Still learning about:*\n"
+        for cat in learning[:5]:  # Show first 5
+            cat_name = cat['category'].replace('_', ' ').title()
+            message += f"• {cat_name} ({cat['confidence']}%)\n"
+
+        if len(learning) > 5:
+            message += f"...and {len(learning) - 5} more\n"
+
+    message += "\nUse /explore to dive deeper into any area!"
+    return message, 'Markdown'
+
+
+def _load_context(db, user_id: int) -> dict:
+    """Current projects, tasks, learned patterns etc. for the prompt."""
+    from app.services.context_cache import get_cached_context
+    return get_cached_context(user_id, db)
+
+
+async def _aload_context(session, user_id: int) -> dict:
+    from app.services.context_cache import aget_cached_context
+    return await aget_cached_context(user_id, session)
+
+
+def _history_query(user_id: int):
+    """Last 10 exchanges from ANY interface, newest first."""
+    from app.models.conversation import Conversation
+
+    # FIXED: Removed 2-hour time limit - get ALL recent conversations
+    return select(Conversation.user_message, Conversation.ai_response).where(
+        Conversation.user_id == user_id
+    ).order_by(Conversation.created_at.desc()).limit(10)
+
+
+def _history_messages(recent_convos) -> list:
+    # Build conversation history (most recent first, so reverse it)
+    conversation_history = []
+    for user_message, ai_response in reversed(recent_convos):
+        conversation_history.append({"role": "user", "content": user_message})
+        conversation_history.append({"role": "assistant", "content": ai_response})
+    return conversation_history
+
+
+def _load_conversation_history(db, user_id: int) -> list:
+    """Last 10 exchanges from ANY interface, oldest first, as chat messages."""
+    return _history_messages(db.execute(_history_query(user_id)).all())
+
+
+async def _aload_conversation_history(session, user_id: int) -> list:
+    return _history_messages((await session.execute(_history_query(user_id))).all())
+
+
+def _apply_feedback(db, user_message: str, user_id: int) -> Optional[str]:
+    """Save explicit user instructions to Sandy; returns a confirmation line or None."""
+    from app.services.feedback import detect_feedback, apply_feedback
+
+    feedback_data = detect_feedback(user_message)
+    if not feedback_data['is_feedback']:
+        return None
+
+    confirmation = apply_feedback(feedback_data, user_id, db)
+    logger.info(f"Applied feedback: {feedback_data['instruction']}")
+    return confirmation
+
+
+def _clean_response(response: str) -> str:
+    """Strip action blocks / raw action JSON from the model output before sending."""
+    clean_response = response
+    
+    # Remove ```action blocks (with proper newlines)
+    clean_response = re.sub(r'```action\s*\n.*?\n```', '', clean_response, flags=re.DOTALL)
+    
+    # Remove any remaining ```action blocks without closing
+    clean_response = re.sub(r'```action\s*\n.*', '', clean_response, flags=re.DOTALL)
+    
+    # Remove raw JSON at start
+    clean_response = re.sub(r'^[✅❌]?\s*[A-Z_]+\s*\{.*?\}\s*\n', '', clean_response, flags=re.DOTALL)
+    
+    return clean_response.strip()
+
+
+def _visible_partial_response(partial: str) -> str:
+    """
+    The part of a still-streaming response that is safe to show.
+    
+    Same stripping as _clean_response, plus holding back anything that may
+    still turn into an action block: a raw ACTION_NAME {...} prefix before
+    its closing line arrives, or a trailing ``` fence that may become ```action.
+    """
+    text = _clean_response(partial)
+    
+    # Raw JSON action at the start that hasn't finished yet
+    if re.match(r'^[✅❌]?\s*[A-Z_]*\s*(\{.*)?$', text, flags=re.DOTALL):
+        return ""
+    
+    fence = text.rfind("```")
+    if fence != -1:
+        tail = text[fence + 3:]
+        if "\n" not in tail and ("action".startswith(tail) or tail.startswith("action")):
+            text = text[:fence].rstrip()
+    
+    # A trailing ` or `` may be the start of a fence
+    return text.rstrip("`").rstrip()
 
 
 # Global telegram service instance
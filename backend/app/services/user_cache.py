@@ -0,0 +1,112 @@
+"""
+Telegram chat_id -> user cache.
+
+Every message and command starts by resolving the chat to a user. The
+answer only changes on /start, /stop or a profile edit, so it is kept in a
+bounded in-process LRU. Entries remember the user's "profile" data version
+and are dropped once the row changes; /start and /stop also invalidate
+their chat explicitly.
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.services import data_versions
+
+_SOURCES = ("profile",)
+
+
+class ChatUser:
+    """The user behind a chat - just what the handlers need."""
+    __slots__ = ("id", "name", "timezone", "morning_briefing_time")
+
+    def __init__(self, id: int, name: Optional[str], timezone: str, morning_briefing_time: str):
+        self.id = id
+        self.name = name
+        self.timezone = timezone
+        self.morning_briefing_time = morning_briefing_time
+
+
+class ChatUserCache:
+    """LRU of chat_id -> ChatUser, validated against data_versions."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[ChatUser, Tuple[int, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chat_id: int) -> Optional[ChatUser]:
+        with self._lock:
+            entry = self._entries.get(chat_id)
+            if entry is not None:
+                user, versions = entry
+                if versions == data_versions.versions(user.id, _SOURCES):
+                    self._entries.move_to_end(chat_id)
+                    self.hits += 1
+                    return user
+                del self._entries[chat_id]
+            self.misses += 1
+            return None
+
+    def put(self, chat_id: int, user: ChatUser):
+        versions = data_versions.versions(user.id, _SOURCES)
+        with self._lock:
+            self._entries[chat_id] = (user, versions)
+            self._entries.move_to_end(chat_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, chat_id: Optional[int] = None):
+        """Drop one chat (or everything)."""
+        with self._lock:
+            if chat_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(chat_id, None)
+
+
+# Singleton instance
+_chat_user_cache: Optional[ChatUserCache] = None
+
+
+def get_chat_user_cache() -> ChatUserCache:
+    """Get or create the chat user cache singleton"""
+    global _chat_user_cache
+    if _chat_user_cache is None:
+        from app.config import get_settings
+        _chat_user_cache = ChatUserCache(max_entries=get_settings().chat_user_cache_max_entries)
+    return _chat_user_cache
+
+
+def _chat_user_query(chat_id: int):
+    return select(User.id, User.name, User.timezone, User.morning_briefing_time).where(
+        User.telegram_chat_id == chat_id
+    )
+
+
+def _cached(chat_id: int, row) -> Optional[ChatUser]:
+    if row is None:
+        return None
+    user = ChatUser(*row)
+    get_chat_user_cache().put(chat_id, user)
+    return user
+
+
+def get_chat_user(db: Session, chat_id: int) -> Optional[ChatUser]:
+    """The user linked to ``chat_id`` (cached), None if not connected."""
+    return get_chat_user_cache().get(chat_id) or _cached(chat_id, db.execute(_chat_user_query(chat_id)).first())
+
+
+async def aget_chat_user(session: AsyncSession, chat_id: int) -> Optional[ChatUser]:
+    """get_chat_user on an AsyncSession."""
+    return get_chat_user_cache().get(chat_id) or _cached(
+        chat_id, (await session.execute(_chat_user_query(chat_id))).first()
+    )
@@ -0,0 +1,322 @@
+"""
+Vector store backends for long-term memory.
+
+MemoryService and DocumentService talk to ``upsert`` / ``query`` / ``fetch``
+with Pinecone's call shapes. Two backends implement them:
+
+- PineconeVectorStore: the hosted serverless index (production default)
+- LocalVectorStore: exact cosine search over a memory-mapped NumPy matrix on
+  local disk - no network hop, works offline, and per-user corpora of this
+  size search in well under a millisecond
+
+Pick one with the ``vector_backend`` setting ("pinecone" or "local").
+"""
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class VectorMatch:
+    """One query hit (same attributes as a Pinecone match)."""
+    __slots__ = ("id", "score", "metadata")
+
+    def __init__(self, id: str, score: float, metadata: Optional[Dict]):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+
+
+class QueryResult:
+    __slots__ = ("matches",)
+
+    def __init__(self, matches: List[VectorMatch]):
+        self.matches = matches
+
+
+class FetchResult:
+    __slots__ = ("vectors",)
+
+    def __init__(self, vectors: Dict[str, Dict]):
+        self.vectors = vectors
+
+
+class VectorStore(ABC):
+    """Minimal vector index interface used by the memory services."""
+
+    @abstractmethod
+    def upsert(self, vectors: List[Dict]) -> None:
+        """Insert or replace ``{"id", "values", "metadata"}`` records."""
+
+    @abstractmethod
+    def query(
+        self,
+        vector: List[float],
+        filter: Optional[Dict] = None,
+        top_k: int = 5,
+        include_metadata: bool = True
+    ) -> QueryResult:
+        """Top-k cosine matches, optionally filtered on metadata."""
+
+    @abstractmethod
+    def fetch(self, ids: List[str]) -> FetchResult:
+        """Records for the given ids (missing ids are left out)."""
+
+
+class PineconeVectorStore(VectorStore):
+    """Pinecone serverless index."""
+
+    def __init__(self, api_key: str, index_name: str, dimension: int):
+        from pinecone import Pinecone, ServerlessSpec
+
+        self.pc = Pinecone(api_key=api_key)
+        self.index_name = index_name
+
+        # Create index if it doesn't exist
+        existing_indexes = [idx.name for idx in self.pc.list_indexes()]
+        if index_name not in existing_indexes:
+            self.pc.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric='cosine',
+                spec=ServerlessSpec(
+                    cloud='aws',
+                    region='us-east-1'
+                )
+            )
+            # Wait for index to be ready
+            time.sleep(10)
+
+        self.index = self.pc.Index(index_name)
+
+    def upsert(self, vectors: List[Dict]) -> None:
+        self.index.upsert(vectors=vectors)
+
+    def query(self, vector, filter=None, top_k=5, include_metadata=True):
+        return self.index.query(
+            vector=vector,
+            filter=filter,
+            top_k=top_k,
+            include_metadata=include_metadata
+        )
+
+    def fetch(self, ids: List[str]):
+        return self.index.fetch(ids=ids)
+
+
+def _matches_condition(value: Any, condition: Any) -> bool:
+    """Pinecone filter semantics for a single metadata field."""
+    if not isinstance(condition, dict):
+        return value == condition
+
+    for op, operand in condition.items():
+        if op == "$eq":
+            ok = value == operand
+        elif op == "$ne":
+            ok = value != operand
+        elif op == "$in":
+            ok = value in operand
+        elif op == "$nin":
+            ok = value not in operand
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            if value is None:
+                return False
+            ok = {
+                "$gt": value > operand,
+                "$gte": value >= operand,
+                "$lt": value < operand,
+                "$lte": value <= operand,
+            }[op]
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if not ok:
+            return False
+    return True
+
+
+def matches_filter(metadata: Dict, filter: Optional[Dict]) -> bool:
+    """Whether a record's metadata satisfies a Pinecone-style filter."""
+    if not filter:
+        return True
+    for field, condition in filter.items():
+        if field == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif field == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif not _matches_condition(metadata.get(field), condition):
+            return False
+    return True
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Exact cosine search over a memory-mapped float32 matrix.
+
+    Layout under ``directory``:
+    - vectors.f32: unit-normalised rows, grown by doubling
+    - records.jsonl: append-only log of (id, row, metadata); last entry wins
+
+    Rows are bucketed by ``user_id`` so a per-user query only scores that
+    user's vectors.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, directory: str, dimension: int):
+        self.directory = Path(directory)
+        self.dimension = dimension
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.directory / "vectors.f32"
+        self._records_path = self.directory / "records.jsonl"
+        self._lock = threading.RLock()
+
+        self._ids: List[str] = []
+        self._metadata: List[Dict] = []
+        self._rows: Dict[str, int] = {}
+        self._user_rows: Dict[Any, List[int]] = {}
+
+        self._load()
+
+    # Storage -----------------------------------------------------------
+
+    def _open_matrix(self, capacity: int):
+        row_bytes = 4 * self.dimension
+        if not self._vectors_path.exists() or self._vectors_path.stat().st_size < capacity * row_bytes:
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        self._capacity = capacity
+        self._matrix = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension)
+        )
+
+    def _load(self):
+        row_bytes = 4 * self.dimension
+        existing = self._vectors_path.stat().st_size // row_bytes if self._vectors_path.exists() else 0
+        self._open_matrix(max(existing, self.INITIAL_CAPACITY))
+
+        if not self._records_path.exists():
+            return
+        with open(self._records_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self._place(record["id"], record["row"], record["metadata"])
+
+    def _place(self, vector_id: str, row: int, metadata: Dict):
+        while len(self._ids) <= row:
+            self._ids.append(None)
+            self._metadata.append(None)
+
+        old = self._metadata[row]
+        user_id = metadata.get("user_id")
+        if old is None:
+            self._user_rows.setdefault(user_id, []).append(row)
+        elif old.get("user_id") != user_id:
+            self._user_rows[old.get("user_id")].remove(row)
+            self._user_rows.setdefault(user_id, []).append(row)
+
+        self._ids[row] = vector_id
+        self._metadata[row] = metadata
+        self._rows[vector_id] = row
+
+    def _grow(self, needed: int):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        self._matrix.flush()
+        del self._matrix
+        self._open_matrix(capacity)
+
+    # VectorStore -------------------------------------------------------
+
+    def upsert(self, vectors: List[Dict]) -> None:
+        with self._lock:
+            records = []
+            for item in vectors:
+                values = np.asarray(item["values"], dtype=np.float32)
+                if values.shape != (self.dimension,):
+                    raise ValueError(f"Expected {self.dimension} dimensions, got {values.shape}")
+                norm = np.linalg.norm(values)
+                if norm:
+                    values = values / norm
+
+                row = self._rows.get(item["id"], len(self._ids))
+                if row >= self._capacity:
+                    self._grow(row + 1)
+
+                metadata = item.get("metadata") or {}
+                self._matrix[row] = values
+                self._place(item["id"], row, metadata)
+                records.append(json.dumps({"id": item["id"], "row": row, "metadata": metadata}))
+
+            self._matrix.flush()
+            with open(self._records_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(records) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def query(self, vector, filter=None, top_k=5, include_metadata=True) -> QueryResult:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        with self._lock:
+            filter = dict(filter or {})
+            user_condition = filter.get("user_id")
+            if user_condition is not None and not isinstance(user_condition, dict):
+                filter.pop("user_id")
+                candidates = list(self._user_rows.get(user_condition, []))
+            else:
+                candidates = [row for row, vid in enumerate(self._ids) if vid is not None]
+
+            if filter:
+                candidates = [row for row in candidates if matches_filter(self._metadata[row], filter)]
+            if not candidates:
+                return QueryResult([])
+
+            rows = np.asarray(candidates)
+            scores = self._matrix[rows] @ query
+
+            k = min(top_k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            return QueryResult([
+                VectorMatch(
+                    self._ids[rows[i]],
+                    float(scores[i]),
+                    dict(self._metadata[rows[i]]) if include_metadata else None
+                )
+                for i in top
+            ])
+
+    def fetch(self, ids: List[str]) -> FetchResult:
+        with self._lock:
+            found = {}
+            for vector_id in ids:
+                row = self._rows.get(vector_id)
+                if row is not None:
+                    found[vector_id] = {
+                        "id": vector_id,
+                        "values": self._matrix[row].tolist(),
+                        "metadata": dict(self._metadata[row])
+                    }
+            return FetchResult(found)
+
+
+def create_vector_store(settings, index_name: str, dimension: int) -> VectorStore:
+    """Build the backend selected by ``settings.vector_backend``."""
+    if settings.vector_backend == "local":
+        return LocalVectorStore(Path(settings.local_vector_dir) / index_name, dimension)
+    if settings.vector_backend == "pinecone":
+        return PineconeVectorStore(settings.pinecone_api_key, index_name, dimension)
+    raise ValueError(f"Unknown vector_backend: {settings.vector_backend}")
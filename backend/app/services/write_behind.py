@@ -0,0 +1,274 @@
+"""
+Write-behind queue for the work that happens after Sandy has replied.
+
+Saving the conversation, extracting learnings and storing the exchange in
+Pinecone don't change what the user sees, so the message handler submits a
+PostReplyJob and returns right after replying. Worker tasks run the job with
+retries and exponential backoff. Each step is one transaction and safe to
+repeat: the conversation row carries the job id, so a job replayed after a
+crash between the insert and the spool update finds it instead of saving
+it again.
+
+Every job is spooled to disk (one JSON file per job) before it is queued and
+only removed once all steps succeed, so a crash or restart replays whatever
+hadn't finished. Jobs that keep failing are moved to ``failed/`` for
+inspection instead of being retried forever.
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Optional
+
+from app.database import run_in_session
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PostReplyJob:
+    """One exchange to persist after the reply has been sent."""
+    user_id: int
+    user_message: str
+    ai_response: str
+    session_id: str
+    input_type: str = "telegram"
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    attempts: int = 0
+    # Progress markers - a retry resumes after the last finished step
+    conversation_id: Optional[int] = None
+    learnings_saved: bool = False
+    memory_stored: bool = False
+
+
+def _save_conversation(db, job: PostReplyJob) -> int:
+    """Save conversation to database for history; returns its id."""
+    from app.models.conversation import Conversation
+    from app.services.pattern_recognition import record_intentions
+
+    # Already saved by an earlier attempt of this job
+    saved_id = db.query(Conversation.id).filter(Conversation.job_id == job.job_id).scalar()
+    if saved_id is not None:
+        return saved_id
+
+    # Use user-based session_id for cross-platform sync
+    conversation = Conversation(
+        user_id=job.user_id,
+        user_message=job.user_message,
+        ai_response=job.ai_response,
+        session_id=job.session_id,
+        input_type=job.input_type,
+        job_id=job.job_id
+    )
+    db.add(conversation)
+    db.flush()
+    # Index its intentions in the same transaction
+    record_intentions(db, conversation)
+    db.commit()
+    return conversation.id
+
+
+def _save_learnings(db, job: PostReplyJob):
+    """
+    REAL-TIME LEARNING - Extract and save patterns from the exchange.
+
+    One transaction; failures go through the job's retries like any step.
+    """
+    from app.services.learning_extraction import extract_and_save_learnings
+
+    learnings = extract_and_save_learnings(
+        user_message=job.user_message,
+        ai_response=job.ai_response,
+        user_id=job.user_id,
+        db=db,
+        action_result=None  # No action was executed in this flow
+    )
+
+    if learnings:
+        logger.info(f"Extracted {len(learnings)} learnings from interaction")
+
+
+async def _store_memory(job: PostReplyJob):
+    """Store to Pinecone for long-term memory."""
+    from app.services.memory import get_memory_service
+
+    memory_service = await asyncio.to_thread(get_memory_service)
+    await memory_service.astore_conversation(
+        conversation_id=job.conversation_id,
+        user_id=job.user_id,
+        user_message=job.user_message,
+        ai_response=job.ai_response,
+        session_id=job.session_id
+    )
+
+
+class WriteBehindQueue:
+    """Durable in-process queue with worker tasks for post-reply work."""
+
+    def __init__(
+        self,
+        spool_dir: str,
+        workers: int = 2,
+        max_attempts: int = 5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0
+    ):
+        self.spool_dir = Path(spool_dir)
+        self.failed_dir = self.spool_dir / "failed"
+        self.worker_count = workers
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._retries = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        """Start workers and replay any jobs left on disk by a previous run."""
+        if self.running:
+            return
+
+        self.failed_dir.mkdir(parents=True, exist_ok=True)
+        self._queue = asyncio.Queue()
+
+        pending = await asyncio.to_thread(self._load_spooled)
+        for job in pending:
+            self._queue.put_nowait(job)
+        if pending:
+            logger.info(f"Replaying {len(pending)} spooled post-reply jobs")
+
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"write-behind-{i}")
+            for i in range(self.worker_count)
+        ]
+
+    async def submit(self, job: PostReplyJob):
+        """Spool the job to disk, then hand it to the workers."""
+        await asyncio.to_thread(self._spool, job)
+        if self._queue is None:
+            logger.warning(f"Write-behind queue not started; job {job.job_id} stays spooled")
+            return
+        self._queue.put_nowait(job)
+
+    async def stop(self, timeout: float = 10.0):
+        """Drain queued jobs (up to ``timeout``), then stop the workers."""
+        if not self.running:
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Write-behind queue not drained; remaining jobs stay spooled")
+
+        for task in self._workers + list(self._retries):
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._retries, return_exceptions=True)
+        self._workers = []
+        self._retries.clear()
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: PostReplyJob):
+        try:
+            if job.conversation_id is None:
+                job.conversation_id = await run_in_session(_save_conversation, job)
+                await asyncio.to_thread(self._spool, job)
+
+            if not job.learnings_saved:
+                await run_in_session(_save_learnings, job)
+                job.learnings_saved = True
+                await asyncio.to_thread(self._spool, job)
+
+            if not job.memory_stored:
+                await _store_memory(job)
+                job.memory_stored = True
+
+        except Exception as e:
+            job.attempts += 1
+            if job.attempts >= self.max_attempts:
+                logger.error(f"Post-reply job {job.job_id} failed {job.attempts} times, giving up: {e}")
+                await asyncio.to_thread(self._move_to_failed, job)
+                return
+
+            delay = min(self.base_backoff * 2 ** (job.attempts - 1), self.max_backoff)
+            logger.warning(f"Post-reply job {job.job_id} failed (attempt {job.attempts}), retrying in {delay:.0f}s: {e}")
+            await asyncio.to_thread(self._spool, job)
+            self._schedule_retry(job, delay)
+            return
+
+        await asyncio.to_thread(self._unspool, job)
+
+    def _schedule_retry(self, job: PostReplyJob, delay: float):
+        async def _requeue():
+            await asyncio.sleep(delay)
+            self._queue.put_nowait(job)
+
+        task = asyncio.create_task(_requeue())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    # Spool files -------------------------------------------------------
+
+    def _path(self, job: PostReplyJob) -> Path:
+        return self.spool_dir / f"{job.job_id}.json"
+
+    def _spool(self, job: PostReplyJob):
+        """Atomically write the job's current state to disk."""
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(job)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(job), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _unspool(self, job: PostReplyJob):
+        self._path(job).unlink(missing_ok=True)
+
+    def _move_to_failed(self, job: PostReplyJob):
+        self.failed_dir.mkdir(parents=True, exist_ok=True)
+        self._spool(job)
+        os.replace(self._path(job), self.failed_dir / f"{job.job_id}.json")
+
+    def _load_spooled(self) -> list:
+        jobs = []
+        for path in sorted(self.spool_dir.glob("*.json"), key=lambda p: p.stat().st_mtime):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    jobs.append(PostReplyJob(**json.load(f)))
+            except Exception as e:
+                logger.error(f"Unreadable spooled job {path.name}, moving to failed/: {e}")
+                os.replace(path, self.failed_dir / path.name)
+        return jobs
+
+
+# Singleton instance
+_write_behind_queue: Optional[WriteBehindQueue] = None
+
+
+def get_write_behind_queue() -> WriteBehindQueue:
+    """Get or create the write-behind queue singleton"""
+    global _write_behind_queue
+    if _write_behind_queue is None:
+        from app.config import get_settings
+        settings = get_settings()
+        _write_behind_queue = WriteBehindQueue(
+            spool_dir=settings.write_behind_spool_dir,
+            workers=settings.write_behind_workers,
+            max_attempts=settings.write_behind_max_attempts
+        )
+    return _write_behind_queue
@@ -0,0 +1,89 @@
+"""
+Rebuild derived tables from history.
+
+Usage:
+    python backfill.py pattern-stats [--user-id ID]
+    python backfill.py intentions [--user-id ID]
+    python backfill.py rollups [--user-id ID]
+"""
+import argparse
+
+from app.database import SessionLocal
+
+
+def backfill_pattern_stats(args):
+    from app.services.pattern_learning import rebuild_pattern_stats
+
+    db = SessionLocal()
+    try:
+        written = rebuild_pattern_stats(db, user_id=args.user_id)
+        print(f"✅ Rebuilt {written} pattern sub-pattern counters")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def backfill_intentions(args):
+    from app.services.pattern_recognition import rebuild_intentions
+
+    db = SessionLocal()
+    try:
+        written = rebuild_intentions(db, user_id=args.user_id)
+        print(f"✅ Indexed {written} intention mentions")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def backfill_rollups(args):
+    from app.services.rollups import refresh_rollups
+
+    db = SessionLocal()
+    try:
+        written = refresh_rollups(db, user_id=args.user_id, full=True)
+        print(f"✅ Rebuilt {written} daily rollup rows")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pattern_stats = commands.add_parser(
+        "pattern-stats",
+        help="Recount observations per (category, sub_pattern) and refresh hypotheses"
+    )
+    pattern_stats.add_argument("--user-id", type=int, default=None, help="Only this user (default: everyone)")
+    pattern_stats.set_defaults(handler=backfill_pattern_stats)
+
+    intentions = commands.add_parser(
+        "intentions",
+        help="Re-extract intention mentions from the conversation history"
+    )
+    intentions.add_argument("--user-id", type=int, default=None, help="Only this user (default: everyone)")
+    intentions.set_defaults(handler=backfill_intentions)
+
+    rollups = commands.add_parser(
+        "rollups",
+        help="Rebuild the daily analytics rollups from the full history"
+    )
+    rollups.add_argument("--user-id", type=int, default=None, help="Only this user (default: everyone)")
+    rollups.set_defaults(handler=backfill_rollups)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Benchmark per-message CPU time of signal extraction.
+
+What each incoming message costs: the feedback check, learning extraction
+and recording its intentions, on a text nothing has seen yet.
+"before": the scans feedback.detect_feedback, learning_extraction and the
+intention scan ran on their own (copied below).
+"after": the production code - detect_feedback, extract_learnings and
+extract_signals(...).intentions.
+
+Usage:
+    python benchmark_signals.py [--rounds N]
+"""
+import argparse
+import re
+import time
+
+from app.services.feedback import detect_feedback
+from app.services.learning_extraction import extract_learnings
+from app.services.signals import MessageSignals, extract_signals, joined_subpatterns
+from app.services.subpatterns import SUBPATTERNS
+
+MESSAGES = [
+    "ok",
+    "done!",
+    "I'll do the taxes later, maybe tomorrow",
+    "Sandy, be less formal please",
+    "remember I work best in the morning",
+    "I need to call the dentist, should take 5 min but I keep putting it off",
+    "Was totally in the zone for 2 hours writing the design doc, deadline is friday",
+    "I'm so tired and overwhelmed, there are too many steps and I don't know where to start",
+    "Going to finish the report soon, it's due tomorrow and my boss is waiting",
+    "From now on stop asking so many questions, just be direct and to the point",
+    "Had a call with Anna, we worked through the admin emails together, took about 45 minutes",
+    "not sure if I should start the new project or finish the boring paperwork first. "
+    "Probably the paperwork. I must get it done, people are expecting it and there's a penalty",
+]
+
+AI_RESPONSE = "What's really stopping you? Maybe try a quick 10 minute start and check in with me after."
+
+
+# Old scans, copied from the consumers before they read MessageSignals -------
+
+def _legacy_get_subpattern(category, text):
+    text_lower = text.lower()
+    for subpattern_key, keywords, _ in SUBPATTERNS[category]:
+        if any(keyword in text_lower for keyword in keywords):
+            return subpattern_key
+    return None
+
+
+def _legacy_learnings(user_message, ai_response, action_result=None):
+    """extract_and_save_learnings before MessageSignals, collecting instead of saving."""
+    observations = []
+    learnings_extracted = []
+
+    def observe(category_name, sub_pattern, observation, context, learned):
+        observations.append(dict(category_name=category_name, sub_pattern=sub_pattern,
+                                 observation=observation, context=context))
+        learnings_extracted.append({'category': category_name, 'subpattern': sub_pattern, 'observation': learned})
+
+    user_lower = user_message.lower()
+    combined_text = f"{user_message} {ai_response or ''}"
+
+    if action_result and action_result.get('success') and action_result.get('action_type') == 'create_task':
+        subpattern = _legacy_get_subpattern('task_initiation', combined_text)
+        observe('task_initiation', subpattern, f"Created task: {user_message[:100]}",
+                {'action': 'task_creation', 'success': True, 'subpattern': subpattern}, 'task creation')
+
+    for phrase in ['later', 'maybe', 'not sure', "i don't know", 'eventually', 'probably']:
+        if phrase in user_lower:
+            subpattern = _legacy_get_subpattern('avoidance_reasons', combined_text)
+            observe('avoidance_reasons', subpattern, f"Used '{phrase}' - possible avoidance: {user_message[:100]}",
+                    {'deflection_phrase': phrase, 'subpattern': subpattern}, f'deflection: {phrase}')
+            break
+
+    for amount, unit in re.findall(r'(\d+)\s*(minute|min|hour|hr|day)s?', user_lower):
+        subpattern = _legacy_get_subpattern('time_perception', user_lower)
+        observe('time_perception', subpattern, f"Estimated {amount} {unit} for task",
+                {'amount': amount, 'unit': unit, 'subpattern': subpattern}, f'{amount} {unit}')
+
+    subpattern = _legacy_get_subpattern('energy_patterns', user_lower)
+    if subpattern:
+        observe('energy_patterns', subpattern, f"Energy signal detected: {user_message[:100]}",
+                {'energy_indicator': subpattern}, 'energy signal')
+
+    if ai_response:
+        subpattern = _legacy_get_subpattern('communication_response', ai_response.lower())
+        if subpattern:
+            observe('communication_response', subpattern, f"Sandy used {subpattern} approach - observe user response",
+                    {'sandy_approach': subpattern, 'user_response': user_message[:100]}, f'approach: {subpattern}')
+
+    subpattern = _legacy_get_subpattern('motivation_sources', user_lower)
+    if subpattern:
+        observe('motivation_sources', subpattern, f"Motivation indicator: {user_message[:100]}",
+                {'motivation_type': subpattern}, 'motivation signal')
+
+    if 'in the zone' in user_lower or 'flow' in user_lower or 'focused' in user_lower:
+        subpattern = _legacy_get_subpattern('hyperfocus_triggers', combined_text)
+        observe('hyperfocus_triggers', subpattern, f"Focus/flow state mentioned: {user_message[:100]}",
+                {'focus_indicator': True, 'subpattern': subpattern}, 'focus state')
+
+    if 'deadline' in user_lower or 'urgent' in user_lower or 'pressure' in user_lower:
+        subpattern = _legacy_get_subpattern('urgency_response', user_lower)
+        observe('urgency_response', subpattern, f"Urgency mentioned: {user_message[:100]}",
+                {'urgency_type': subpattern}, 'urgency signal')
+
+    if any(word in user_lower for word in ['waiting', 'expecting', 'deadline', 'must', 'have to']):
+        subpattern = _legacy_get_subpattern('accountability_effectiveness', user_lower)
+        if subpattern:
+            observe('accountability_effectiveness', subpattern, f"Accountability signal: {user_message[:100]}",
+                    {'accountability_type': subpattern}, 'accountability signal')
+
+    return observations, learnings_extracted
+
+
+def _legacy_feedback_scan(user_message):
+    msg_lower = user_message.lower()
+    triggers = ['sandy, ', 'hey sandy,', 'remember ', 'don\'t forget', 'please remember', 'from now on',
+                'stop ', 'don\'t ', 'i prefer', 'i like when', 'i don\'t like when', 'be more', 'be less',
+                'you should', 'can you be']
+    if not any(trigger in msg_lower for trigger in triggers):
+        return None
+    for group in (['formal', 'casual', 'friendly', 'professional', 'playful', 'serious', 'tone'],
+                  ['questions', 'asking', 'stop asking', 'don\'t ask'],
+                  ['direct', 'blunt', 'straight', 'to the point']):
+        if any(word in msg_lower for word in group):
+            return group[0]
+    if 'remember' in msg_lower or 'don\'t forget' in msg_lower:
+        if any(word in msg_lower for word in ['morning', 'afternoon', 'evening', 'night', 'time']):
+            return 'energy_patterns'
+        if any(word in msg_lower for word in ['task', 'work', 'project']):
+            return 'task_initiation'
+    return 'general'
+
+
+def _legacy_intention_scan(user_message):
+    message_lower = user_message.lower()
+    found = []
+    for phrase in ["later", "tomorrow", "soon", "need to", "should", "gonna", "going to", "will do"]:
+        if phrase in message_lower:
+            words = message_lower.split()
+            if phrase in words:
+                idx = words.index(phrase)
+                if idx + 1 < len(words):
+                    found.append(" ".join(words[idx + 1:idx + 4]))
+    return found
+
+
+def message_before(message):
+    _legacy_feedback_scan(message)
+    _legacy_learnings(message, AI_RESPONSE)
+    _legacy_intention_scan(message)
+
+
+def message_after(message):
+    extract_signals.cache_clear()  # every message is new text
+    detect_feedback(message)
+    extract_learnings(message, AI_RESPONSE)
+    extract_signals(message).intentions
+
+
+def _run(fn, rounds):
+    start = time.process_time()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            fn(message)
+    return (time.process_time() - start) / (rounds * len(MESSAGES)) * 1e6
+
+
+def measure(rounds, repeats=7):
+    """Best of ``repeats`` interleaved runs of each, in CPU µs per message."""
+    before = after = float("inf")
+    for _ in range(repeats):
+        before = min(before, _run(message_before, rounds))
+        after = min(after, _run(message_after, rounds))
+    return before, after
+
+
+def check_equivalence():
+    """Same results as the old scans (single-word intentions only - multi-word
+    phrases like 'need to' never matched before)."""
+    action = {'success': True, 'action_type': 'create_task'}
+    for message in MESSAGES:
+        assert extract_learnings(message, AI_RESPONSE, action) == _legacy_learnings(message, AI_RESPONSE, action), message
+        signals = MessageSignals(message)
+        for category in SUBPATTERNS:
+            assert signals.subpatterns.first(category) == _legacy_get_subpattern(category, message), (category, message)
+        joined = joined_subpatterns(message, AI_RESPONSE)
+        for category in SUBPATTERNS:
+            assert joined.first(category) == _legacy_get_subpattern(category, f"{message} {AI_RESPONSE}"), (category, message)
+        legacy = _legacy_intention_scan(message)
+        single_word = [i.activity for i in signals.intentions if " " not in i.phrase]
+        assert single_word == legacy, (message, single_word, legacy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    check_equivalence()
+
+    before_us, after_us = measure(args.rounds)
+
+    print(f"Messages: {len(MESSAGES)} x {args.rounds} rounds, best of 7, CPU µs per message")
+    print(f"{'before':>10}{'after':>10}{'ratio':>8}")
+    print(f"{before_us:>10.1f}{after_us:>10.1f}{before_us / after_us:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Check that the hot per-message queries are served by their indexes.
+
+Runs EXPLAIN on each query (with sequential scans disabled, so an empty or
+small dev database still shows which index the planner would pick) and
+fails if the expected index isn't in the plan. Queries on tables the
+database doesn't have (pattern_hypotheses is not created by the migrations)
+are skipped. Run it after migrating:
+
+    alembic upgrade head
+    python check_query_plans.py [--user-id N]
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, inspect, select, text
+
+from app.database import engine
+from app.models.intention import IntentionMention
+from app.models.pattern_tracking import PatternHypothesis
+from app.models.task import Task, TaskStatus
+from app.services.context import _projects_query, _tasks_query
+from app.services.telegram_service import _history_query
+from app.services.user_cache import _chat_user_query
+
+
+def _checks(user_id: int):
+    """(description, statement, expected index) for each hot query."""
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    return [
+        ("conversation history", _history_query(user_id), "idx_conversations_user_created_at"),
+        ("incomplete tasks", _tasks_query(user_id), "idx_tasks_user_status_due_date"),
+        ("active projects", _projects_query(user_id), "idx_projects_user_status_deadline"),
+        ("chat -> user", _chat_user_query(123456789), "idx_users_telegram_chat_id"),
+        (
+            "task completions (rollups)",
+            select(Task.user_id, Task.completed_at).where(
+                Task.status == TaskStatus.DONE,
+                Task.completed_at.isnot(None),
+                Task.completed_at >= week_ago
+            ),
+            "idx_tasks_completed_at"
+        ),
+        (
+            "hypotheses by category/subpattern",
+            select(PatternHypothesis).where(
+                PatternHypothesis.category_id.in_([1, 2]),
+                PatternHypothesis.sub_pattern == "deadline_driven"
+            ),
+            "idx_pattern_hypotheses_category_sub_pattern"
+        ),
+        (
+            "confirmed patterns",
+            select(PatternHypothesis.id).where(
+                PatternHypothesis.user_id == user_id,
+                PatternHypothesis.status == "confirmed",
+                PatternHypothesis.confidence >= 80
+            ).order_by(PatternHypothesis.confidence.desc()),
+            "idx_pattern_hypotheses_user_status_confidence"
+        ),
+        (
+            "repeated intentions",
+            select(IntentionMention.activity, func.count(IntentionMention.id)).where(
+                and_(IntentionMention.user_id == user_id, IntentionMention.mentioned_at >= week_ago)
+            ).group_by(IntentionMention.activity),
+            "idx_intention_mentions_user_mentioned_activity"
+        ),
+    ]
+
+
+def _index_names(plan) -> set:
+    """Every "Index Name" anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    names = set()
+    if isinstance(plan, dict):
+        if "Index Name" in plan:
+            names.add(plan["Index Name"])
+        for value in plan.values():
+            names |= _index_names(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            names |= _index_names(item)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+
+    failures = 0
+    with engine.connect() as conn:
+        tables = set(inspect(conn).get_table_names())
+        conn.execute(text("SET enable_seqscan = off"))
+        for name, stmt, expected in _checks(args.user_id):
+            missing = {table.name for table in stmt.get_final_froms()} - tables
+            if missing:
+                print(f"SKIP {name}: no table {', '.join(sorted(missing))}")
+                continue
+            sql = stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+            plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            used = _index_names(plan)
+            ok = expected in used
+            failures += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {name}: {', '.join(sorted(used)) or 'no index'}"
+                  + ("" if ok else f" (expected {expected})"))
+        conn.rollback()
+
+    if failures:
+        print(f"\n{failures} queries not using their index")
+        sys.exit(1)
+    print("\nAll hot queries use their indexes")
+
+
+if __name__ == "__main__":
+    main()
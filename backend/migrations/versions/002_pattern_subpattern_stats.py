@@ -0,0 +1,51 @@
+"""pattern sub-pattern stats
+
+Revision ID: pattern_stats_002
+Revises: clean_schema_001
+Create Date: 2026-10-17
+
+Running per-(category, sub_pattern) observation counters, so adding an
+observation updates one counter instead of rescanning the category.
+The counters are filled from the existing observations here (hypotheses
+are re-derived from them, so they must start at the full history);
+python backfill.py pattern-stats recomputes them later.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'pattern_stats_002'
+down_revision = 'clean_schema_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('pattern_subpattern_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('sub_pattern', sa.String(100), nullable=False),
+        sa.Column('observation_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('first_observed_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('last_observed_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['category_id'], ['pattern_categories.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('category_id', 'sub_pattern', name='uq_pattern_subpattern_stats_category_sub_pattern')
+    )
+    op.create_index('ix_pattern_subpattern_stats_id', 'pattern_subpattern_stats', ['id'])
+    op.create_index('ix_pattern_subpattern_stats_user_id', 'pattern_subpattern_stats', ['user_id'])
+
+    # Same grouping as rebuild_pattern_stats ('general' = no sub-pattern)
+    op.execute("""
+        INSERT INTO pattern_subpattern_stats
+            (user_id, category_id, sub_pattern, observation_count, first_observed_at, last_observed_at)
+        SELECT user_id, category_id, COALESCE(sub_pattern, 'general'), COUNT(id), MIN(observed_at), MAX(observed_at)
+        FROM pattern_observations
+        GROUP BY user_id, category_id, COALESCE(sub_pattern, 'general')
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('pattern_subpattern_stats')
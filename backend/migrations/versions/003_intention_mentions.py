@@ -0,0 +1,40 @@
+"""intention mentions
+
+Revision ID: intention_mentions_003
+Revises: pattern_stats_002
+Create Date: 2026-10-17
+
+Intentions ("I'll do X later") extracted once when a conversation is saved,
+so repeated-intention detection is a GROUP BY instead of a rescan of the
+last week of messages. Populate from existing conversations with:
+python backfill.py intentions
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'intention_mentions_003'
+down_revision = 'pattern_stats_002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('intention_mentions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('conversation_id', sa.Integer(), nullable=False),
+        sa.Column('activity', sa.String(200), nullable=False),
+        sa.Column('phrase', sa.String(50), nullable=False),
+        sa.Column('mentioned_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_intention_mentions_user_mentioned_activity', 'intention_mentions',
+                    ['user_id', 'mentioned_at', 'activity'])
+    op.create_index('idx_intention_mentions_conversation_id', 'intention_mentions', ['conversation_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('intention_mentions')
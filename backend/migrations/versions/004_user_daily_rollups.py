@@ -0,0 +1,55 @@
+"""user daily rollups
+
+Revision ID: daily_rollups_004
+Revises: intention_mentions_003
+Create Date: 2026-10-17
+
+Per-user daily activity summaries (tasks, conversations, work sessions,
+check-ins), refreshed on a schedule by the bot so analytics read O(days)
+rows instead of the raw tables. Populate from existing history with:
+python backfill.py rollups
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = 'daily_rollups_004'
+down_revision = 'intention_mentions_003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    counter = dict(nullable=False, server_default='0')
+    op.create_table('user_daily_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('tasks_created', sa.Integer(), **counter),
+        sa.Column('tasks_done', sa.Integer(), **counter),
+        sa.Column('tasks_in_progress', sa.Integer(), **counter),
+        sa.Column('tasks_todo', sa.Integer(), **counter),
+        sa.Column('done_seconds_total', sa.Float(), **counter),
+        sa.Column('done_timed', sa.Integer(), **counter),
+        sa.Column('tasks_completed', sa.Integer(), **counter),
+        sa.Column('completions_by_hour', postgresql.JSONB, nullable=False, server_default='{}'),
+        sa.Column('messages', sa.Integer(), **counter),
+        sa.Column('project_switches', sa.Integer(), **counter),
+        sa.Column('first_project', sa.String(200), nullable=True),
+        sa.Column('last_project', sa.String(200), nullable=True),
+        sa.Column('work_sessions', sa.Integer(), **counter),
+        sa.Column('work_sessions_completed', sa.Integer(), **counter),
+        sa.Column('focus_minutes', sa.Integer(), **counter),
+        sa.Column('checkins', sa.Integer(), **counter),
+        sa.Column('energy_total', sa.Integer(), **counter),
+        sa.Column('energy_ratings', sa.Integer(), **counter),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'day', name='uq_user_daily_rollups_user_day')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_daily_rollups')
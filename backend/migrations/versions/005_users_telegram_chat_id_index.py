@@ -0,0 +1,34 @@
+"""unique index on users.telegram_chat_id
+
+Revision ID: users_chat_id_005
+Revises: daily_rollups_004
+Create Date: 2026-10-17
+
+Every bot handler resolves the user by telegram_chat_id; this makes that an
+index lookup and guarantees one account per chat. Should a chat somehow be
+linked to several accounts, only the oldest account keeps the link.
+"""
+from alembic import op
+
+# revision identifiers
+revision = 'users_chat_id_005'
+down_revision = 'daily_rollups_004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        UPDATE users SET telegram_chat_id = NULL, telegram_username = NULL
+        WHERE telegram_chat_id IS NOT NULL
+          AND id NOT IN (
+              SELECT min(id) FROM users
+              WHERE telegram_chat_id IS NOT NULL
+              GROUP BY telegram_chat_id
+          )
+    """)
+    op.create_index('idx_users_telegram_chat_id', 'users', ['telegram_chat_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_users_telegram_chat_id', table_name='users')
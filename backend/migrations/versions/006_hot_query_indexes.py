@@ -0,0 +1,70 @@
+"""composite indexes for hot queries
+
+Revision ID: hot_query_indexes_006
+Revises: users_chat_id_005
+Create Date: 2026-10-17
+
+Indexes matching the shapes of the per-message queries:
+- conversations: latest messages of a user (user_id, created_at DESC)
+- tasks: a user's tasks by status, by due date (user_id, status, due_date)
+- tasks: completions since a date (partial, completed_at IS NOT NULL)
+- projects: a user's active projects by deadline (user_id, status, deadline)
+- pattern_hypotheses: per (category_id, sub_pattern) and confirmed
+  patterns by confidence (user_id, status, confidence). No migration in
+  this chain creates that table (only the pre-clean-schema migrations in
+  old_migrations_backup/ did), so these two are skipped where it is absent.
+
+Single-column indexes that are a prefix of a new composite are dropped.
+Verify the plans with: python check_query_plans.py
+"""
+from alembic import op
+import sqlalchemy as sa
+
+def _has_pattern_hypotheses() -> bool:
+    return sa.inspect(op.get_bind()).has_table('pattern_hypotheses')
+
+
+# revision identifiers
+revision = 'hot_query_indexes_006'
+down_revision = 'users_chat_id_005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_conversations_user_created_at', 'conversations',
+                    ['user_id', sa.text('created_at DESC')], if_not_exists=True)
+    op.drop_index('idx_conversations_user_id', table_name='conversations', if_exists=True)
+
+    op.create_index('idx_tasks_user_status_due_date', 'tasks', ['user_id', 'status', 'due_date'], if_not_exists=True)
+    op.drop_index('idx_tasks_user_status', table_name='tasks', if_exists=True)
+    op.create_index('idx_tasks_completed_at', 'tasks', ['completed_at'],
+                    postgresql_where=sa.text('completed_at IS NOT NULL'), if_not_exists=True)
+
+    op.create_index('idx_projects_user_status_deadline', 'projects', ['user_id', 'status', 'deadline'],
+                    if_not_exists=True)
+    op.drop_index('idx_projects_user_status', table_name='projects', if_exists=True)
+
+    if _has_pattern_hypotheses():
+        op.create_index('idx_pattern_hypotheses_category_sub_pattern', 'pattern_hypotheses',
+                        ['category_id', 'sub_pattern'], if_not_exists=True)
+        op.create_index('idx_pattern_hypotheses_user_status_confidence', 'pattern_hypotheses',
+                        ['user_id', 'status', 'confidence'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    if _has_pattern_hypotheses():
+        op.drop_index('idx_pattern_hypotheses_user_status_confidence', table_name='pattern_hypotheses',
+                      if_exists=True)
+        op.drop_index('idx_pattern_hypotheses_category_sub_pattern', table_name='pattern_hypotheses',
+                      if_exists=True)
+
+    op.create_index('idx_projects_user_status', 'projects', ['user_id', 'status'])
+    op.drop_index('idx_projects_user_status_deadline', table_name='projects')
+
+    op.drop_index('idx_tasks_completed_at', table_name='tasks')
+    op.create_index('idx_tasks_user_status', 'tasks', ['user_id', 'status'])
+    op.drop_index('idx_tasks_user_status_due_date', table_name='tasks')
+
+    op.create_index('idx_conversations_user_id', 'conversations', ['user_id'])
+    op.drop_index('idx_conversations_user_created_at', table_name='conversations')
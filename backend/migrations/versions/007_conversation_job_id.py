@@ -0,0 +1,27 @@
+"""write-behind job id on conversations
+
+Revision ID: conversation_job_id_007
+Revises: hot_query_indexes_006
+Create Date: 2026-10-17
+
+The write-behind queue stores its job id on the conversation it saves, so a
+job replayed after a crash finds the row instead of inserting a duplicate.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'conversation_job_id_007'
+down_revision = 'hot_query_indexes_006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('job_id', sa.String(32), nullable=True))
+    op.create_index('idx_conversations_job_id', 'conversations', ['job_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_conversations_job_id', table_name='conversations')
+    op.drop_column('conversations', 'job_id')
@@ -12,7 +12,10 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.services.telegram_service import get_telegram_service
-from app.database import SessionLocal
+from app.services.ai import close_http_client
+from app.services.write_behind import get_write_behind_queue
+from app.services.rollups import get_rollup_scheduler
+from app.database import SessionLocal, dispose_async_engine
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -56,6 +59,12 @@ async def main():
         # Stop bot
         if service and service.application and service.application.updater:
             await service.application.updater.stop()
+        if service:
+            await service.stop_memory_warmup()
+        await get_rollup_scheduler().stop()
+        await get_write_behind_queue().stop()
+        await close_http_client()
+        await dispose_async_engine()
         logger.info("👋 Bot stopped")
 
 